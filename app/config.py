@@ -13,3 +13,127 @@ if not DATABASE_URL:
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER")
+
+# "async" runs the async routes on an AsyncEngine (asyncpg / aiosqlite);
+# "sync" keeps the blocking Session so the two can be benchmarked.
+DATABASE_MODE = os.getenv("DATABASE_MODE", "async")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Point at the fake endpoint (uvicorn app.routers.fake_twilio:app) to load-test offline.
+TWILIO_API_BASE = os.getenv("TWILIO_API_BASE", "https://api.twilio.com").rstrip("/")
+WHATSAPP_QUEUE_SIZE = int(os.getenv("WHATSAPP_QUEUE_SIZE", "1000"))
+WHATSAPP_WORKERS = int(os.getenv("WHATSAPP_WORKERS", "4"))
+WHATSAPP_MAX_RETRIES = int(os.getenv("WHATSAPP_MAX_RETRIES", "5"))
+WHATSAPP_RETRY_BASE_DELAY = float(os.getenv("WHATSAPP_RETRY_BASE_DELAY", "0.5"))
+
+FAKE_TWILIO_LATENCY_MS = int(os.getenv("FAKE_TWILIO_LATENCY_MS", "50"))
+FAKE_TWILIO_ERROR_RATE = float(os.getenv("FAKE_TWILIO_ERROR_RATE", "0"))
+
+# Serve dashboard counts from the incrementally maintained dashboard_counters
+# table instead of aggregating the source tables on every page load. Build
+# the table once with `python -m app.services.dashboard_metrics`; until then
+# the counts are aggregated as before.
+DASHBOARD_COUNTERS = os.getenv("DASHBOARD_COUNTERS", "false").lower() == "true"
+
+# Migrations are a deploy step: run `python -m app.migrations` once before
+# starting the new workers. AUTO_MIGRATE=true applies them on startup
+# instead, which makes every worker wait on them; only for local
+# development. Search and other features need their migrations applied.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() == "true"
+
+# "memory" fans events out within one process; "postgres" uses LISTEN/NOTIFY
+# so every worker sees events from every other worker.
+REALTIME_BACKEND = os.getenv("REALTIME_BACKEND", "memory")
+
+# Seconds each worker caches a logged-in user's identity and role. Role
+# changes and deactivations drop the entry right away in every worker with
+# REALTIME_BACKEND=postgres. With the memory backend only the worker that
+# made the change hears about it and the others wait out the TTL, so the
+# default there is kept short.
+IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "30" if REALTIME_BACKEND == "postgres" else "5"))
+
+# Acknowledge Twilio webhooks as soon as the payload is stored in
+# inbound_messages and let a background worker process it in batches.
+WEBHOOK_FAST_ACK = os.getenv("WEBHOOK_FAST_ACK", "true").lower() == "true"
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", "1.0"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+
+# Country calling code (digits only, e.g. "91") assumed for phone numbers
+# entered without a leading + or 00. Empty means such numbers are taken to
+# already start with their country code.
+DEFAULT_COUNTRY_CODE = os.getenv("DEFAULT_COUNTRY_CODE", "").lstrip("+")
+CONTACT_CACHE_SIZE = int(os.getenv("CONTACT_CACHE_SIZE", "10000"))
+
+# bcrypt cost for new hashes. Existing hashes at another cost are upgraded
+# the next time their user logs in.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Password hashing runs on its own small pool so a login burst can't occupy
+# the threads every other sync route needs.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64"))
+
+LOGIN_MAX_ATTEMPTS_PER_USER = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_USER", "5"))
+LOGIN_USER_WINDOW = int(os.getenv("LOGIN_USER_WINDOW", "300"))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "30"))
+LOGIN_IP_WINDOW = int(os.getenv("LOGIN_IP_WINDOW", "60"))
+# Comma-separated addresses or CIDR ranges of the reverse proxies in front
+# of the app (e.g. "10.0.0.0/8,127.0.0.1"). Requests from them are
+# attributed to the client address they put in X-Forwarded-For, so the
+# per-IP login limit applies per client rather than to the proxy. Never
+# list ranges that clients can connect from directly.
+TRUSTED_PROXIES = [proxy.strip() for proxy in os.getenv("TRUSTED_PROXIES", "").split(",") if proxy.strip()]
+
+# Low-stock digests go to this WhatsApp number; alerts are off when unset.
+OWNER_WHATSAPP_NUMBER = os.getenv("OWNER_WHATSAPP_NUMBER")
+# Items that go low within this many seconds of each other share one digest.
+LOW_STOCK_ALERT_DELAY = float(os.getenv("LOW_STOCK_ALERT_DELAY", "30"))
+LOW_STOCK_RESYNC_INTERVAL = float(os.getenv("LOW_STOCK_RESYNC_INTERVAL", "300"))
+
+# Comma-separated read replicas for the dashboard and inbox pages. Empty
+# sends everything to DATABASE_URL.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# After a user writes, their reads stay on the primary this long so they
+# see their own change despite replica lag.
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Seconds a rendered dashboard page may be served again from memory to the
+# same user while its data version is unchanged. 0 disables it. This and
+# ETag/304 revalidation need REALTIME_BACKEND=postgres, which tells every
+# worker about changes; with the memory backend both stay off. Pages read
+# from a replica are never cached.
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "0"))
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "256"))
+
+# Compiled templates are cached on disk so workers after the first skip the
+# Jinja compile step. An empty dir uses a per-user folder in the system temp dir.
+TEMPLATE_BYTECODE_CACHE = os.getenv("TEMPLATE_BYTECODE_CACHE", "true").lower() == "true"
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR") or None
+# Compile every template at startup instead of on its first request.
+TEMPLATE_WARMUP = os.getenv("TEMPLATE_WARMUP", "true").lower() == "true"
+
+# Prometheus-format /metrics, off by default. Scrapers must send
+# METRICS_TOKEN as a bearer token, so enabling it requires one.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+if METRICS_ENABLED and not METRICS_TOKEN:
+    raise ValueError("METRICS_TOKEN must be set when METRICS_ENABLED is true.")
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+
+# Development-only query profiler: per-request statement log, repeated
+# statement (N+1) detection and EXPLAIN for slow statements. Adds overhead
+# and logs SQL; keep it off in production.
+QUERY_PROFILER = os.getenv("QUERY_PROFILER", "false").lower() == "true"
+QUERY_PROFILER_SLOW_MS = float(os.getenv("QUERY_PROFILER_SLOW_MS", "100"))
+# A statement shape run this many times in one request is reported as N+1.
+QUERY_PROFILER_REPEAT_THRESHOLD = int(os.getenv("QUERY_PROFILER_REPEAT_THRESHOLD", "5"))
+
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+# On Postgres at most this many matching messages are ranked per search, so
+# a very common term can't make a query rank millions of rows.
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "2000"))
+# Matches are first looked for among this many most recent messages, which
+# are walked newest first and stop once enough are found. Older messages
+# are only searched when the recent ones don't fill SEARCH_MAX_CANDIDATES.
+SEARCH_RECENT_WINDOW = int(os.getenv("SEARCH_RECENT_WINDOW", "50000"))
@@ -1,6 +1,21 @@
+import random
+import time
+
+from fastapi import Request
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from .config import DATABASE_URL
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.dml import UpdateBase
+from .config import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    DATABASE_MODE,
+    DATABASE_REPLICA_URLS,
+    READ_YOUR_WRITES_SECONDS,
+)
 
 engine = create_engine(
     DATABASE_URL,
@@ -12,9 +27,185 @@ engine = create_engine(
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
+# INSERT constructs with ON CONFLICT support, by dialect.
+UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def upsert_insert(session: Session, model):
+    return UPSERT_DIALECTS[session.get_bind().dialect.name](model)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# =========================
+# READ REPLICAS
+# =========================
+
+replica_engines = [
+    create_engine(url, pool_pre_ping=True, pool_size=5, max_overflow=10)
+    for url in DATABASE_REPLICA_URLS
+]
+
+
+class RoutingSession(Session):
+    # Sends plain reads to one replica (picked per session, so a page sees a
+    # single consistent snapshot) and INSERT/UPDATE/DELETE and flushes to
+    # the primary. Replica reads may lag the primary slightly.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica = random.choice(replica_engines)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            return engine
+        return self.replica
+
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autoflush=False, autocommit=False)
+
+PRIMARY_PIN_KEY = "read_primary_until"
+
+
+def pin_primary(request: Request):
+    # Read-your-writes: keep this user's reads on the primary for a short
+    # while after they change something.
+    if replica_engines:
+        request.session[PRIMARY_PIN_KEY] = time.time() + READ_YOUR_WRITES_SECONDS
+
+
+def get_read_db(request: Request):
+    # For read-mostly pages. Falls back to the primary when no replicas are
+    # configured or the user has just written.
+    pinned = request.session.get(PRIMARY_PIN_KEY, 0) > time.time()
+    if not replica_engines or pinned:
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# =========================
+# ASYNC SESSIONS
+# =========================
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if not driver:
+        raise ValueError(f"No async driver configured for {url.get_backend_name()}.")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+class SyncSessionAdapter:
+    # Exposes the subset of the AsyncSession API the routers use, but runs
+    # every call inline on a plain Session. This is the pre-async behaviour
+    # (queries block the event loop) and exists so DATABASE_MODE=sync can be
+    # benchmarked against the async engine with identical handler code.
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    @property
+    def info(self):
+        return self.sync_session.info
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, params=None, **kwargs):
+        return self.sync_session.execute(statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return self.sync_session.scalar(statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        return self.sync_session.scalars(statement, params, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return self.sync_session.get(entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        self.sync_session.delete(instance)
+
+    async def flush(self, objects=None):
+        self.sync_session.flush(objects)
+
+    async def refresh(self, instance, attribute_names=None):
+        self.sync_session.refresh(instance, attribute_names)
+
+    async def commit(self):
+        self.sync_session.commit()
+
+    async def rollback(self):
+        self.sync_session.rollback()
+
+    async def close(self):
+        self.sync_session.close()
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.sync_session, *args, **kwargs)
+
+
+if DATABASE_MODE == "async":
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL or async_database_url(DATABASE_URL),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_pre_ping=True,
+        pool_size=5,
+        max_overflow=10,
+    )
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+elif DATABASE_MODE == "sync":
+    async_engine = None
+    AsyncSessionLocal = None
+else:
+    raise ValueError("DATABASE_MODE must be 'async' or 'sync'.")
+
+
+def new_async_session():
+    if AsyncSessionLocal is None:
+        return SyncSessionAdapter(SessionLocal())
+    return AsyncSessionLocal()
+
+
+async def get_async_db():
+    db = new_async_session()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def named_engines() -> dict:
+    # Every engine this process may use, at the sync level where engine and
+    # pool events fire. Used by the instrumentation.
+    engines = {"primary": engine}
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+    for index, replica in enumerate(replica_engines):
+        engines[f"replica{index}"] = replica
+    return engines
@@ -1,10 +1,29 @@
+import logging
+
 from fastapi import FastAPI
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.responses import RedirectResponse
-from app.config import SESSION_SECRET
-from app.database import engine, Base, SessionLocal
-from app.models import User
-from app.routers import auth, onboarding, owner, staff, client
+from app.config import (
+    SESSION_SECRET,
+    AUTO_MIGRATE,
+    WEBHOOK_FAST_ACK,
+    TEMPLATE_WARMUP,
+    METRICS_ENABLED,
+    QUERY_PROFILER,
+)
+from app.database import engine, async_engine, Base
+from app.migrations import pending_migrations, run_migrations
+from app.routers import auth, onboarding, owner, staff, client, webhook, metrics
+from app.services.inbound_queue import start_inbound_worker, stop_inbound_worker
+from app.services.metrics import MetricsMiddleware, instrument_engines, start_loop_monitor, stop_loop_monitor
+from app.services.query_profiler import QueryProfilerMiddleware, install_query_profiler
+from app.services.onboarding_state import ensure_onboarded, refresh_onboarding_state
+from app.services.realtime import start_realtime, stop_realtime
+from app.services.stock_alerts import start_stock_alerts, stop_stock_alerts
+from app.services.whatsapp_service import start_whatsapp_sender, stop_whatsapp_sender
+from app.templating import warm_templates
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 app.add_middleware(SessionMiddleware, secret_key=SESSION_SECRET)
@@ -13,15 +32,46 @@ app.add_middleware(SessionMiddleware, secret_key=SESSION_SECRET)
 @app.on_event("startup")
 def startup():
     Base.metadata.create_all(bind=engine)
+    if AUTO_MIGRATE:
+        run_migrations()
+    else:
+        pending = pending_migrations()
+        if pending:
+            logger.warning(
+                f"Pending migrations {', '.join(pending)}; run `python -m app.migrations`"
+            )
+    refresh_onboarding_state()
+    if TEMPLATE_WARMUP:
+        warm_templates()
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    await start_realtime()
+    await start_whatsapp_sender()
+    await start_stock_alerts()
+    if METRICS_ENABLED:
+        await start_loop_monitor()
+    if WEBHOOK_FAST_ACK:
+        await start_inbound_worker()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_inbound_worker()
+    await stop_loop_monitor()
+    await stop_stock_alerts()
+    await stop_whatsapp_sender()
+    await stop_realtime()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 @app.middleware("http")
 async def onboarding_gate(request, call_next):
-    db = SessionLocal()
-    owner_exists = db.query(User).filter(User.role == "owner").first()
-    db.close()
+    onboarded = await ensure_onboarded()
 
-    if not owner_exists and request.url.path not in ["/onboarding"]:
+    if not onboarded and request.url.path not in ["/onboarding", "/metrics"]:
         return RedirectResponse("/onboarding")
 
     response = await call_next(request)
@@ -33,6 +83,17 @@ app.include_router(onboarding.router)
 app.include_router(owner.router)
 app.include_router(staff.router)
 app.include_router(client.router)
+app.include_router(webhook.router)
+
+if METRICS_ENABLED:
+    instrument_engines()
+    # Added last so it sits outermost and times the whole stack.
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router)
+
+if QUERY_PROFILER:
+    install_query_profiler()
+    app.add_middleware(QueryProfilerMiddleware)
 
 
 @app.get("/")
@@ -1,21 +1,160 @@
-from fastapi import Request
+import threading
+import time
+from dataclasses import dataclass
+
+from fastapi import Request, Depends
 from fastapi.responses import RedirectResponse
-from .database import SessionLocal
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .config import IDENTITY_CACHE_TTL
+from .database import SessionLocal, get_db, get_async_db, get_read_db
 from .models import User
+from .services.realtime import broker, emit
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    id: int
+    name: str
+    username: str
+    role: str
+
+
+# user_id -> (expires_at, CurrentUser). Only active users are cached.
+_identity_cache = {}
+_identity_lock = threading.Lock()
+
+
+def invalidate_user(user_id: int):
+    with _identity_lock:
+        _identity_cache.pop(user_id, None)
+
+
+def invalidate_all_users():
+    with _identity_lock:
+        _identity_cache.clear()
+
+
+def _cached_identity(user_id: int):
+    with _identity_lock:
+        entry = _identity_cache.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        _identity_cache.pop(user_id, None)
+    return None
+
+
+def _remember(user: User):
+    identity = CurrentUser(id=user.id, name=user.name, username=user.username, role=user.role)
+    with _identity_lock:
+        _identity_cache[user.id] = (time.monotonic() + IDENTITY_CACHE_TTL, identity)
+    return identity
+
+
+def load_user(db: Session, user_id: int):
+    identity = _cached_identity(user_id)
+    if identity:
+        return identity
+
+    user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
+    return _remember(user) if user else None
+
+
+async def load_user_async(db: AsyncSession, user_id: int):
+    identity = _cached_identity(user_id)
+    if identity:
+        return identity
+
+    user = await db.scalar(
+        select(User).where(User.id == user_id, User.is_active == True).limit(1)
+    )
+    return _remember(user) if user else None
+
+
+def _request_user(request: Request, db: Session):
+    if hasattr(request.state, "user"):
+        return request.state.user
+
+    user_id = request.session.get("user_id")
+    user = load_user(db, user_id) if user_id else None
+    request.state.user = user
+    return user
+
+
+def get_request_user(request: Request, db: Session = Depends(get_db)):
+    # Reuses the route's own get_db session, so an authenticated request
+    # holds a single pool connection (and none at all on a cache hit).
+    return _request_user(request, db)
+
+
+def get_read_request_user(request: Request, db: Session = Depends(get_read_db)):
+    # The same for routes on get_read_db: the user is loaded through the
+    # route's read session rather than opening a second one.
+    return _request_user(request, db)
+
+
+async def get_async_request_user(request: Request, db: AsyncSession = Depends(get_async_db)):
+    if hasattr(request.state, "user"):
+        return request.state.user
+
+    user_id = request.session.get("user_id")
+    user = await load_user_async(db, user_id) if user_id else None
+    request.state.user = user
+    return user
+
 
 def get_current_user(request: Request):
     user_id = request.session.get("user_id")
     if not user_id:
         return None
+    user = _cached_identity(user_id)
+    if user:
+        return user
     db = SessionLocal()
-    user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
-    db.close()
-    return user
+    try:
+        return load_user(db, user_id)
+    finally:
+        db.close()
+
 
 def require_role(role: str):
-    def role_checker(request: Request):
-        user = get_current_user(request)
+    def role_checker(user: CurrentUser = Depends(get_request_user)):
         if not user or user.role != role:
             return RedirectResponse("/login")
         return user
-    return role_checker
\ No newline at end of file
+    return role_checker
+
+
+# Role changes and deactivations must not wait for the TTL. Ids are collected
+# at flush time and dropped from this worker's cache once the transaction
+# commits; the realtime event does the same in the other workers.
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = {obj.id for obj in session.dirty | session.deleted if isinstance(obj, User)}
+    new = changed - session.info.setdefault("changed_user_ids", set())
+    if new:
+        session.info["changed_user_ids"] |= new
+        emit(session, {"type": "users_changed", "user_ids": sorted(new)})
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_ids", None)
+
+
+def _on_event(payload: dict):
+    if payload.get("type") == "users_changed":
+        for user_id in payload["user_ids"]:
+            invalidate_user(user_id)
+    elif payload.get("type") == "resync":
+        invalidate_all_users()
+
+
+broker.add_listener(_on_event)
@@ -0,0 +1,171 @@
+import importlib
+import logging
+import pkgutil
+from contextlib import contextmanager
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, inspect, select, text
+
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Versioned schema changes for databases that already exist. Fresh databases
+# get the current schema from Base.metadata.create_all, so every migration
+# must be idempotent (IF NOT EXISTS, inspector checks) and safe to replay.
+#
+# A migration is a module in app/migrations/versions exposing upgrade(conn).
+# Modules that set TRANSACTIONAL = False get an AUTOCOMMIT connection, which
+# Postgres needs for CREATE INDEX CONCURRENTLY.
+
+MIGRATION_LOCK_ID = 72_310_001
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def available_migrations():
+    from app.migrations import versions
+
+    names = sorted(m.name for m in pkgutil.iter_modules(versions.__path__))
+    return [(name, importlib.import_module(f"{versions.__name__}.{name}")) for name in names]
+
+
+@contextmanager
+def _migration_lock(bind):
+    # Several workers may start at once; only one applies migrations.
+    if bind.dialect.name != "postgresql":
+        yield
+        return
+
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+
+def pending_migrations(bind=engine) -> list:
+    metadata.create_all(bind)
+    with bind.connect() as conn:
+        done = set(conn.scalars(select(schema_migrations.c.version)))
+    return [version for version, _ in available_migrations() if version not in done]
+
+
+def run_migrations(bind=engine):
+    metadata.create_all(bind)
+    applied = []
+
+    with _migration_lock(bind):
+        with bind.connect() as conn:
+            done = set(conn.scalars(select(schema_migrations.c.version)))
+
+        for version, module in available_migrations():
+            if version in done:
+                continue
+
+            logger.info(f"Applying migration {version}")
+            if getattr(module, "TRANSACTIONAL", True):
+                with bind.begin() as conn:
+                    module.upgrade(conn)
+                    conn.execute(schema_migrations.insert().values(version=version))
+            else:
+                with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    module.upgrade(conn)
+                with bind.begin() as conn:
+                    conn.execute(schema_migrations.insert().values(version=version))
+            applied.append(version)
+
+    return applied
+
+
+# =========================
+# HELPERS FOR MIGRATIONS
+# =========================
+
+def create_index(
+    conn,
+    name: str,
+    table: str,
+    columns: str,
+    where: str = None,
+    unique: bool = False,
+    using: str = None,
+):
+    unique_sql = "UNIQUE " if unique else ""
+    where_sql = f" WHERE {where}" if where else ""
+    using_sql = f" USING {using}" if using else ""
+
+    if conn.dialect.name == "postgresql":
+        # A failed CONCURRENTLY build leaves an INVALID index behind that
+        # IF NOT EXISTS would happily skip; drop it so the retry rebuilds.
+        invalid = conn.scalar(
+            text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": name},
+        )
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(
+            f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON {table}{using_sql} ({columns}){where_sql}"
+        ))
+    else:
+        conn.execute(text(
+            f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table}{using_sql} ({columns}){where_sql}"
+        ))
+
+
+def create_sqlite_fts(conn, fts: str, source: str, columns, tokenize: str):
+    # External-content FTS5 table over `source`, kept in sync by triggers
+    # and filled from the existing rows.
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{source}', content_rowid='id', tokenize='{tokenize}')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END"
+    ))
+    conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def add_column(conn, table: str, name: str, type_, default: str = None, nullable: bool = True):
+    if name in {column["name"] for column in inspect(conn).get_columns(table)}:
+        return
+
+    ddl = f"ALTER TABLE {table} ADD COLUMN {name} {type_.compile(dialect=conn.dialect)}"
+    if default is not None:
+        ddl += f" DEFAULT {default}"
+    if not nullable:
+        ddl += " NOT NULL"
+    conn.execute(text(ddl))
+
+
+def id_batches(conn, table: str, size: int = 5000):
+    low, high = conn.execute(text(f"SELECT min(id), max(id) FROM {table}")).one()
+    if low is None:
+        return
+    for start in range(low, high + 1, size):
+        yield start, start + size
@@ -0,0 +1,8 @@
+import logging
+
+from app.migrations import run_migrations
+
+logging.basicConfig(level=logging.INFO)
+
+applied = run_migrations()
+print(f"Applied {len(applied)} migration(s): {', '.join(applied) or 'none'}")
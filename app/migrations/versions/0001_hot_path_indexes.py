@@ -0,0 +1,17 @@
+from app.migrations import create_index
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    ("ix_bookings_contact_id_status", "bookings", "contact_id, status", None),
+    ("ix_bookings_pending_contact_id", "bookings", "contact_id", "status = 'pending'"),
+    ("ix_conversations_status", "conversations", "status", None),
+    ("ix_conversations_open", "conversations", "id", "status = 'open'"),
+    ("ix_messages_conversation_id_timestamp", "messages", "conversation_id, timestamp, id", None),
+    ("ix_tickets_contact_id", "tickets", "contact_id", None),
+]
+
+
+def upgrade(conn):
+    for name, table, columns, where in INDEXES:
+        create_index(conn, name, table, columns, where)
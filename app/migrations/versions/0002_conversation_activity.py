@@ -0,0 +1,60 @@
+from sqlalchemy import DateTime, Integer, String, text
+
+from app.migrations import add_column, create_index, id_batches
+
+# Runs outside a transaction so the backfill commits batch by batch and the
+# index can be built concurrently.
+TRANSACTIONAL = False
+
+POSTGRES_BACKFILL = """
+UPDATE conversations c
+SET last_message_at = COALESCE(m.timestamp, c.created_at, now()),
+    last_message_preview = left(m.body, 120)
+FROM conversations c2
+LEFT JOIN LATERAL (
+    SELECT timestamp, body FROM messages
+    WHERE conversation_id = c2.id
+    ORDER BY timestamp DESC, id DESC
+    LIMIT 1
+) m ON true
+WHERE c.id = c2.id AND c.id >= :low AND c.id < :high AND c.last_message_at IS NULL
+"""
+
+# SQLite stores DateTime as text; match SQLAlchemy's microsecond format so
+# keyset comparisons against bound cursors stay consistent.
+SQLITE_BACKFILL = """
+UPDATE conversations
+SET last_message_preview = (
+        SELECT substr(body, 1, 120) FROM messages
+        WHERE conversation_id = conversations.id
+        ORDER BY timestamp DESC, id DESC LIMIT 1
+    ),
+    last_message_at = strftime('%Y-%m-%d %H:%M:%f', COALESCE(
+        (SELECT max(timestamp) FROM messages WHERE conversation_id = conversations.id),
+        created_at,
+        CURRENT_TIMESTAMP
+    )) || '000'
+WHERE id >= :low AND id < :high AND last_message_at IS NULL
+"""
+
+
+def upgrade(conn):
+    add_column(conn, "conversations", "last_message_at", DateTime(timezone=True))
+    add_column(conn, "conversations", "last_message_preview", String())
+    add_column(conn, "conversations", "unread_count", Integer(), default="0", nullable=False)
+
+    backfill = POSTGRES_BACKFILL if conn.dialect.name == "postgresql" else SQLITE_BACKFILL
+    for low, high in id_batches(conn, "conversations"):
+        conn.execute(text(backfill), {"low": low, "high": high})
+
+    if conn.dialect.name == "postgresql":
+        # Rows inserted by workers still on the old code.
+        conn.execute(text("ALTER TABLE conversations ALTER COLUMN last_message_at SET DEFAULT now()"))
+
+    create_index(
+        conn,
+        "ix_conversations_open_activity",
+        "conversations",
+        "last_message_at, id",
+        "status = 'open'",
+    )
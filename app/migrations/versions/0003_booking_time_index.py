@@ -0,0 +1,7 @@
+from app.migrations import create_index
+
+TRANSACTIONAL = False
+
+
+def upgrade(conn):
+    create_index(conn, "ix_bookings_start_time_end_time", "bookings", "start_time, end_time")
@@ -0,0 +1,151 @@
+import logging
+import re
+
+from sqlalchemy import text
+
+from app.config import DEFAULT_COUNTRY_CODE
+from app.migrations import id_batches
+
+logger = logging.getLogger(__name__)
+
+# Rewrites contacts.phone to E.164 and merges contacts that turn out to be
+# the same number. The lowest id survives and inherits the duplicates'
+# tickets, bookings and messages. Runs in one transaction so a failure
+# leaves the contacts untouched. Every rewrite and merge is recorded in
+# contact_phone_changes so it can be audited or undone by hand.
+#
+# Numbers in national format need DEFAULT_COUNTRY_CODE; without it the
+# migration refuses to run rather than guess.
+#
+# Running processes cache phone -> contact ids; restart them after applying
+# this out of band.
+
+# Frozen copy of app.utils.phone.normalize_phone at the time of this
+# migration, so later changes to the live helper can't change what it does.
+_E164_DIGITS = re.compile(r"[1-9][0-9]{7,14}")
+_SEPARATORS = re.compile(r"[\s\-.()/]")
+
+
+def _strip(phone: str) -> str:
+    return _SEPARATORS.sub("", phone.replace("whatsapp:", ""))
+
+
+def is_national(phone: str) -> bool:
+    return not _strip(phone).startswith(("+", "00"))
+
+
+def canonical_phone(phone: str, country_code: str) -> str:
+    phone = _strip(phone)
+    if phone.startswith("+"):
+        digits = phone[1:]
+    elif phone.startswith("00"):
+        digits = phone[2:]
+    else:
+        digits = country_code + phone.lstrip("0")
+
+    if not _E164_DIGITS.fullmatch(digits):
+        return ""
+    return f"+{digits}"
+
+
+def _conversation(conn, contact_id):
+    return conn.execute(
+        text(
+            "SELECT id, last_message_at, last_message_preview, unread_count "
+            "FROM conversations WHERE contact_id = :id"
+        ),
+        {"id": contact_id},
+    ).one_or_none()
+
+
+def _merge(conn, duplicate_id, survivor_id):
+    kept = _conversation(conn, survivor_id)
+    merged = _conversation(conn, duplicate_id)
+
+    if merged and kept:
+        for table in ("messages", "tickets"):
+            conn.execute(
+                text(f"UPDATE {table} SET conversation_id = :kept WHERE conversation_id = :merged"),
+                {"kept": kept.id, "merged": merged.id},
+            )
+        latest = max(kept, merged, key=lambda c: c.last_message_at)
+        conn.execute(
+            text(
+                "UPDATE conversations SET last_message_at = :at, last_message_preview = :preview, "
+                "unread_count = :unread WHERE id = :id"
+            ),
+            {
+                "id": kept.id,
+                "at": latest.last_message_at,
+                "preview": latest.last_message_preview,
+                "unread": kept.unread_count + merged.unread_count,
+            },
+        )
+        conn.execute(text("DELETE FROM conversations WHERE id = :id"), {"id": merged.id})
+    elif merged:
+        conn.execute(
+            text("UPDATE conversations SET contact_id = :kept WHERE id = :id"),
+            {"kept": survivor_id, "id": merged.id},
+        )
+
+    for table in ("tickets", "bookings"):
+        conn.execute(
+            text(f"UPDATE {table} SET contact_id = :kept WHERE contact_id = :merged"),
+            {"kept": survivor_id, "merged": duplicate_id},
+        )
+    conn.execute(text("DELETE FROM contacts WHERE id = :id"), {"id": duplicate_id})
+
+
+def _record_changes(conn, changes):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS contact_phone_changes ("
+        "contact_id INTEGER NOT NULL, old_phone VARCHAR NOT NULL, "
+        "new_phone VARCHAR NOT NULL, merged_into INTEGER)"
+    ))
+    if changes:
+        conn.execute(
+            text(
+                "INSERT INTO contact_phone_changes (contact_id, old_phone, new_phone, merged_into) "
+                "VALUES (:id, :old, :new, :merged_into)"
+            ),
+            changes,
+        )
+
+
+def upgrade(conn, country_code: str = DEFAULT_COUNTRY_CODE):
+    survivors = {}
+    renames = []
+    merges = []
+    changes = []
+
+    for low, high in id_batches(conn, "contacts"):
+        rows = conn.execute(
+            text("SELECT id, phone FROM contacts WHERE id >= :low AND id < :high ORDER BY id"),
+            {"low": low, "high": high},
+        )
+        for contact_id, phone in rows:
+            if not country_code and is_national(phone):
+                raise RuntimeError(
+                    "Contacts have phone numbers without a country code; set "
+                    "DEFAULT_COUNTRY_CODE before running migration 0004."
+                )
+            # Numbers that can't be parsed are left exactly as they are.
+            canonical = canonical_phone(phone, country_code) or phone
+            if canonical in survivors:
+                merges.append((contact_id, survivors[canonical]))
+                changes.append({"id": contact_id, "old": phone, "new": canonical, "merged_into": survivors[canonical]})
+                continue
+            survivors[canonical] = contact_id
+            if canonical != phone:
+                renames.append({"id": contact_id, "phone": canonical})
+                changes.append({"id": contact_id, "old": phone, "new": canonical, "merged_into": None})
+
+    _record_changes(conn, changes)
+    for duplicate_id, survivor_id in merges:
+        logger.info(f"Merging contact {duplicate_id} into {survivor_id}")
+        _merge(conn, duplicate_id, survivor_id)
+    logger.info(f"Canonicalized {len(renames)} phone number(s), merged {len(merges)} contact(s)")
+
+    # Duplicates are gone, so the canonical phones no longer collide.
+    if renames:
+        conn.execute(text("UPDATE contacts SET phone = :phone WHERE id = :id"), renames)
@@ -0,0 +1,26 @@
+from sqlalchemy import text
+
+from app.migrations import create_index, create_sqlite_fts
+from app.services.search import CONTACT_DOCUMENT, MESSAGE_DOCUMENT
+
+# Postgres: GIN indexes over tsvector expressions, built concurrently so
+# large messages tables stay writable and aren't rewritten.
+#
+# SQLite: external-content FTS5 tables (the text lives only in the base
+# tables) with triggers, then a one-off rebuild from existing rows.
+TRANSACTIONAL = False
+
+SQLITE_FTS = {
+    "messages_fts": ("messages", ["body"], "porter unicode61"),
+    "contacts_fts": ("contacts", ["name", "phone"], "unicode61"),
+}
+
+
+def upgrade(conn):
+    if conn.dialect.name == "postgresql":
+        create_index(conn, "ix_messages_body_fts", "messages", MESSAGE_DOCUMENT, using="gin")
+        create_index(conn, "ix_contacts_search_fts", "contacts", CONTACT_DOCUMENT, using="gin")
+        return
+
+    for fts, (source, columns, tokenize) in SQLITE_FTS.items():
+        create_sqlite_fts(conn, fts, source, columns, tokenize)
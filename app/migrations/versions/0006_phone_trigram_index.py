@@ -0,0 +1,21 @@
+from sqlalchemy import text
+
+from app.migrations import create_index, create_sqlite_fts
+
+# Partial phone numbers ("3210") are substrings, which neither the B-tree
+# nor the full-text indexes can serve.
+#
+# Postgres: a pg_trgm GIN index on contacts.phone, so LIKE '%digits%' is an
+# index scan rather than a sequential scan.
+#
+# SQLite: an FTS5 table with the trigram tokenizer over the same column.
+TRANSACTIONAL = False
+
+
+def upgrade(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        create_index(conn, "ix_contacts_phone_trgm", "contacts", "phone gin_trgm_ops", using="gin")
+        return
+
+    create_sqlite_fts(conn, "contact_phones_fts", "contacts", ["phone"], "trigram")
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
 from .database import Base
 
 
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
 class Workspace(Base):
     __tablename__ = "workspace"
 
@@ -53,9 +58,31 @@ class Conversation(Base):
     status = Column(String, default="open")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Denormalized inbox fields, maintained by app.services.inbox
+    last_message_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now(), nullable=False)
+    last_message_preview = Column(String)
+    unread_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     contact = relationship("Contact", back_populates="conversation")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete")
 
+    __table_args__ = (
+        Index("ix_conversations_status", "status"),
+        Index(
+            "ix_conversations_open",
+            "id",
+            postgresql_where=text("status = 'open'"),
+            sqlite_where=text("status = 'open'"),
+        ),
+        Index(
+            "ix_conversations_open_activity",
+            "last_message_at",
+            "id",
+            postgresql_where=text("status = 'open'"),
+            sqlite_where=text("status = 'open'"),
+        ),
+    )
+
 
 class Message(Base):
     __tablename__ = "messages"
@@ -64,10 +91,14 @@ class Message(Base):
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"))
     sender = Column(String, nullable=False)
     body = Column(Text, nullable=False)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
 
     conversation = relationship("Conversation", back_populates="messages")
 
+    __table_args__ = (
+        Index("ix_messages_conversation_id_timestamp", "conversation_id", "timestamp", "id"),
+    )
+
 
 class Ticket(Base):
     __tablename__ = "tickets"
@@ -80,6 +111,10 @@ class Ticket(Base):
     status = Column(String, default="submitted")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_tickets_contact_id", "contact_id"),
+    )
+
 
 class Booking(Base):
     __tablename__ = "bookings"
@@ -94,6 +129,17 @@ class Booking(Base):
     secret_code_hash = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_bookings_contact_id_status", "contact_id", "status"),
+        Index("ix_bookings_start_time_end_time", "start_time", "end_time"),
+        Index(
+            "ix_bookings_pending_contact_id",
+            "contact_id",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+    )
+
 
 class Inventory(Base):
     __tablename__ = "inventory"
@@ -103,3 +149,51 @@ class Inventory(Base):
     quantity = Column(Integer, nullable=False, default=0)
     threshold = Column(Integer, nullable=False, default=5)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class InventoryMovement(Base):
+    # Append-only stock ledger; rows are never updated or deleted.
+    __tablename__ = "inventory_movements"
+
+    id = Column(Integer, primary_key=True)
+    inventory_id = Column(Integer, ForeignKey("inventory.id", ondelete="CASCADE"), nullable=False)
+    delta = Column(Integer, nullable=False)
+    quantity_after = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_inventory_movements_inventory_id_created_at", "inventory_id", "created_at", "id"),
+    )
+
+
+class DashboardCounter(Base):
+    __tablename__ = "dashboard_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class InboundMessage(Base):
+    __tablename__ = "inbound_messages"
+
+    id = Column(Integer, primary_key=True)
+    message_sid = Column(String, unique=True, nullable=False)
+    from_number = Column(String, nullable=False)
+    body = Column(Text, nullable=False, default="")
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    received_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    claimed_at = Column(DateTime(timezone=True))
+    processed_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index(
+            "ix_inbound_messages_pending",
+            "id",
+            postgresql_where=text("status IN ('pending', 'processing')"),
+            sqlite_where=text("status IN ('pending', 'processing')"),
+        ),
+    )
@@ -1,14 +1,40 @@
 from fastapi import APIRouter, Request, Form, Depends
 from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.config import (
+    LOGIN_MAX_ATTEMPTS_PER_USER,
+    LOGIN_USER_WINDOW,
+    LOGIN_MAX_ATTEMPTS_PER_IP,
+    LOGIN_IP_WINDOW,
+)
+from app.database import get_async_db
 from app.models import User
-from app.utils.security import verify_password
+from app.utils.client_ip import client_ip
+from app.utils.rate_limit import RateLimiter
+from app.utils.security import (
+    PasswordPoolBusy,
+    hash_password,
+    needs_rehash,
+    run_password_task,
+    verify_password,
+)
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+
+# Failed logins per username; every attempt per client address.
+user_limiter = RateLimiter(LOGIN_MAX_ATTEMPTS_PER_USER, LOGIN_USER_WINDOW)
+ip_limiter = RateLimiter(LOGIN_MAX_ATTEMPTS_PER_IP, LOGIN_IP_WINDOW)
+
+
+def too_many_attempts(retry_after: int):
+    return HTMLResponse(
+        "Too many login attempts. Please try again later.",
+        status_code=429,
+        headers={"Retry-After": str(retry_after)},
+    )
 
 
 @router.get("/login", response_class=HTMLResponse)
@@ -20,20 +46,49 @@ def login_form(request: Request):
 
 
 @router.post("/login")
-def login(
+async def login(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(
-        User.username == username,
-        User.is_active == True
-    ).first()
+    # Limits are checked before any hashing so rejected attempts cost
+    # nothing but a dictionary lookup.
+    user_key = username.strip().lower()
+    ip_key = client_ip(request)
+    retry_after = max(user_limiter.retry_after(user_key), ip_limiter.retry_after(ip_key))
+    if retry_after:
+        return too_many_attempts(retry_after)
+    ip_limiter.hit(ip_key)
 
-    if not user or not verify_password(password, user.password_hash):
+    user = await db.scalar(
+        select(User).where(
+            User.username == username,
+            User.is_active == True
+        ).limit(1)
+    )
+
+    try:
+        valid = user is not None and await run_password_task(
+            verify_password, password, user.password_hash
+        )
+    except PasswordPoolBusy:
+        return too_many_attempts(1)
+
+    if not valid:
+        user_limiter.hit(user_key)
         return RedirectResponse("/login", status_code=302)
 
+    user_limiter.reset(user_key)
+
+    if needs_rehash(user.password_hash):
+        try:
+            user.password_hash = await run_password_task(hash_password, password)
+            await db.commit()
+        except PasswordPoolBusy:
+            # Not worth failing the login over; retried next time.
+            pass
+
     request.session["user_id"] = user.id
 
     if user.role == "owner":
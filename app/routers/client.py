@@ -1,14 +1,12 @@
 from fastapi import APIRouter, Form, Depends, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta
 import secrets
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import (
-    Contact,
-    Conversation,
     Ticket,
     Booking,
     Workspace,
@@ -16,11 +14,13 @@ from app.models import (
 )
 from app.utils.phone import normalize_phone
 from app.utils.security import hash_secret_code
+from app.services.availability import compile_schedule, free_slots, reserve_slot
+from app.services.intake import open_intake
 from app.services.whatsapp_service import send_whatsapp_message
+from app.templating import templates
 
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 def generate_ticket_number():
@@ -32,18 +32,12 @@ def generate_secret_code():
 
 
 def validate_booking_time(workspace: Workspace, date_str: str, time_str: str):
-    local_dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
-
-    active_days = [d.strip() for d in workspace.active_days.split(",")]
-    weekday = local_dt.strftime("%a")
-
-    if weekday not in active_days:
+    try:
+        local_dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+    except ValueError:
         return None
 
-    start_hour = datetime.strptime(workspace.active_hours_start, "%H:%M").time()
-    end_hour = datetime.strptime(workspace.active_hours_end, "%H:%M").time()
-
-    if not (start_hour <= local_dt.time() <= end_hour):
+    if not compile_schedule(workspace).accepts(local_dt):
         return None
 
     return local_dt
@@ -57,31 +51,29 @@ def client_home(request: Request):
     )
 
 
-def get_or_create_contact(db: Session, name: str, phone: str):
-    phone = normalize_phone(phone)
-    contact = db.query(Contact).filter(Contact.phone == phone).first()
-
-    if not contact:
-        contact = Contact(name=name, phone=phone)
-        db.add(contact)
-        db.commit()
-        db.refresh(contact)
-
-    return contact
-
+@router.get("/client/availability")
+async def booking_availability(
+    start: str,
+    days: int = 7,
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        first_day = date.fromisoformat(start)
+    except ValueError:
+        return JSONResponse({"error": "start must be YYYY-MM-DD"}, status_code=400)
 
-def get_or_create_conversation(db: Session, contact: Contact):
-    convo = db.query(Conversation).filter(
-        Conversation.contact_id == contact.id
-    ).first()
+    workspace = await db.scalar(select(Workspace).limit(1))
+    if not workspace:
+        return {"slots": {}}
 
-    if not convo:
-        convo = Conversation(contact_id=contact.id)
-        db.add(convo)
-        db.commit()
-        db.refresh(convo)
+    slots = await free_slots(db, workspace, first_day, days)
 
-    return convo
+    return {
+        "slots": {
+            day.isoformat(): [slot.strftime("%H:%M") for slot in day_slots]
+            for day, day_slots in slots.items()
+        }
+    }
 
 
 @router.post("/client/query")
@@ -89,14 +81,16 @@ async def submit_query(
     name: str = Form(...),
     phone: str = Form(...),
     message: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    contact = get_or_create_contact(db, name, phone)
-    convo = get_or_create_conversation(db, contact)
+    if not normalize_phone(phone):
+        return HTMLResponse("Invalid phone number.", status_code=400)
+
+    intake = await open_intake(db, name, phone)
 
     db.add(
         Message(
-            conversation_id=convo.id,
+            conversation_id=intake.conversation_id,
             sender="client",
             body=message,
         )
@@ -107,14 +101,14 @@ async def submit_query(
     ticket = Ticket(
         ticket_number=ticket_number,
         form_type="query",
-        contact_id=contact.id,
-        conversation_id=convo.id,
+        contact_id=intake.contact_id,
+        conversation_id=intake.conversation_id,
     )
     db.add(ticket)
-    db.commit()
+    await db.commit()
 
     await send_whatsapp_message(
-        contact.phone,
+        intake.phone,
         f"Your query ticket number is {ticket_number}. We will contact you shortly.",
     )
 
@@ -128,9 +122,12 @@ async def submit_booking(
     service_type: str = Form(...),
     date: str = Form(...),
     time: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    workspace = db.query(Workspace).first()
+    if not normalize_phone(phone):
+        return HTMLResponse("Invalid phone number.", status_code=400)
+
+    workspace = await db.scalar(select(Workspace).limit(1))
     if not workspace:
         return RedirectResponse("/client", status_code=302)
 
@@ -138,41 +135,44 @@ async def submit_booking(
     if not valid_time:
         return HTMLResponse("Invalid booking time.")
 
-    contact = get_or_create_contact(db, name, phone)
-    convo = get_or_create_conversation(db, contact)
+    end_time = valid_time + timedelta(
+        minutes=workspace.default_service_duration_minutes
+    )
+
+    # Everything below is one transaction, which also holds the slot.
+    if not await reserve_slot(db, valid_time, end_time):
+        await db.rollback()
+        return HTMLResponse("That time slot is already booked.", status_code=409)
+
+    intake = await open_intake(db, name, phone)
 
     ticket_number = generate_ticket_number()
 
     ticket = Ticket(
         ticket_number=ticket_number,
         form_type="booking",
-        contact_id=contact.id,
-        conversation_id=convo.id,
+        contact_id=intake.contact_id,
+        conversation_id=intake.conversation_id,
     )
     db.add(ticket)
-    db.commit()
-    db.refresh(ticket)
+    await db.flush()
 
     secret_code = generate_secret_code()
     hashed_code = hash_secret_code(secret_code)
 
-    end_time = valid_time + timedelta(
-        minutes=workspace.default_service_duration_minutes
-    )
-
     booking = Booking(
         ticket_id=ticket.id,
-        contact_id=contact.id,
+        contact_id=intake.contact_id,
         service_type=service_type,
         start_time=valid_time,
         end_time=end_time,
         secret_code_hash=hashed_code,
     )
     db.add(booking)
-    db.commit()
+    await db.commit()
 
     await send_whatsapp_message(
-        contact.phone,
+        intake.phone,
         f"Booking created. Ticket: {ticket_number}. "
         f"Your secret code is {secret_code}. Send this via WhatsApp to confirm.",
     )
@@ -186,24 +186,26 @@ async def submit_feedback(
     phone: str = Form(...),
     rating: int = Form(...),
     feedback: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    contact = get_or_create_contact(db, name, phone)
-    convo = get_or_create_conversation(db, contact)
+    if not normalize_phone(phone):
+        return HTMLResponse("Invalid phone number.", status_code=400)
+
+    intake = await open_intake(db, name, phone)
 
     ticket_number = generate_ticket_number()
 
     ticket = Ticket(
         ticket_number=ticket_number,
         form_type="feedback",
-        contact_id=contact.id,
-        conversation_id=convo.id,
+        contact_id=intake.contact_id,
+        conversation_id=intake.conversation_id,
     )
     db.add(ticket)
-    db.commit()
+    await db.commit()
 
     await send_whatsapp_message(
-        contact.phone,
+        intake.phone,
         f"Thank you for your feedback. Ticket: {ticket_number}",
     )
 
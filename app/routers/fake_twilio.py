@@ -0,0 +1,48 @@
+import asyncio
+import random
+import secrets
+
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.config import FAKE_TWILIO_LATENCY_MS, FAKE_TWILIO_ERROR_RATE
+
+# Stand-in for the Twilio Messages API, for offline load tests:
+#   uvicorn app.routers.fake_twilio:app --port 8001
+#   TWILIO_API_BASE=http://127.0.0.1:8001 (with any TWILIO_ACCOUNT_SID)
+
+router = APIRouter()
+
+
+@router.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+async def create_message(account_sid: str, request: Request):
+    form_data = await request.form()
+
+    if FAKE_TWILIO_LATENCY_MS:
+        await asyncio.sleep(FAKE_TWILIO_LATENCY_MS / 1000)
+
+    roll = random.random()
+    if roll < FAKE_TWILIO_ERROR_RATE / 2:
+        return JSONResponse(
+            {"code": 20429, "message": "Too Many Requests"},
+            status_code=429,
+            headers={"Retry-After": "1"},
+        )
+    if roll < FAKE_TWILIO_ERROR_RATE:
+        return JSONResponse({"code": 20500, "message": "Internal Server Error"}, status_code=500)
+
+    return JSONResponse(
+        {
+            "sid": f"SM{secrets.token_hex(16)}",
+            "account_sid": account_sid,
+            "from": form_data.get("From"),
+            "to": form_data.get("To"),
+            "body": form_data.get("Body"),
+            "status": "queued",
+        },
+        status_code=201,
+    )
+
+
+app = FastAPI()
+app.include_router(router)
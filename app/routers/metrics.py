@@ -0,0 +1,18 @@
+import hmac
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse, Response
+
+from app.config import METRICS_TOKEN
+from app.services.metrics import CONTENT_TYPE, render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+def metrics(request: Request):
+    supplied = request.headers.get("authorization", "")
+    if not hmac.compare_digest(supplied, f"Bearer {METRICS_TOKEN}"):
+        return PlainTextResponse("Unauthorized", status_code=401)
+
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -1,21 +1,21 @@
 from fastapi import APIRouter, Form, Request, Depends
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Workspace, User, Inventory
-from app.utils.security import hash_password
+from app.services.inventory import record_initial_stock
+from app.utils.security import PasswordPoolBusy, hash_password, run_password_task
+from app.services.onboarding_state import mark_onboarded, refresh_onboarding_state
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("/onboarding")
-def onboarding_form(request: Request, db: Session = Depends(get_db)):
-    owner_exists = db.query(User).filter(User.role == "owner").first()
-
-    if owner_exists:
+def onboarding_form(request: Request):
+    if refresh_onboarding_state():
         return RedirectResponse("/login", status_code=302)
 
     return templates.TemplateResponse(
@@ -25,7 +25,7 @@ def onboarding_form(request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/onboarding")
-def onboarding_submit(
+async def onboarding_submit(
     request: Request,
     business_name: str = Form(...),
     address_line: str = Form(...),
@@ -40,13 +40,27 @@ def onboarding_submit(
     name: str = Form(...),
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    owner_exists = db.query(User).filter(User.role == "owner").first()
+    owner_exists = await db.scalar(select(User.id).where(User.role == "owner").limit(1))
 
     if owner_exists:
+        mark_onboarded()
         return RedirectResponse("/login", status_code=302)
 
+    try:
+        password_hash = await run_password_task(hash_password, password)
+    except PasswordPoolBusy:
+        return templates.TemplateResponse(
+            "onboarding.html",
+            {
+                "request": request,
+                "error": "The server is busy. Please try again in a moment.",
+            },
+            status_code=503,
+            headers={"Retry-After": "1"},
+        )
+
     # Create workspace
     workspace = Workspace(
         business_name=business_name,
@@ -67,13 +81,14 @@ def onboarding_submit(
     owner = User(
         name=name,
         username=username,
-        password_hash=hash_password(password),
+        password_hash=password_hash,
         role="owner",
         is_active=True
     )
     db.add(owner)
 
-    db.commit()
+    await db.commit()
+    mark_onboarded()
 
     # Create default inventory item
     default_item = Inventory(
@@ -82,7 +97,8 @@ def onboarding_submit(
         threshold=5
     )
     db.add(default_item)
-    db.commit()
+    await db.run_sync(record_initial_stock, default_item, owner.id)
+    await db.commit()
 
     # Auto-login owner
     request.session["user_id"] = owner.id
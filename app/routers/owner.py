@@ -1,15 +1,32 @@
-from fastapi import APIRouter, Depends, Request, Form
-from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
+import io
+from dataclasses import asdict
+from datetime import date
+from typing import List
+
+from fastapi import APIRouter, Depends, Request, Form, File, UploadFile
+from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import User, Contact, Conversation, Booking, Inventory
-from app.middleware import get_current_user
-from app.utils.security import hash_password
+from app.database import get_db, get_async_db, get_read_db, pin_primary
+from app.models import User, Inventory
+from app.middleware import CurrentUser, get_request_user, get_async_request_user, get_read_request_user
+from app.services.bulk_import import IMPORT_KINDS, IMPORT_FORMATS, MalformedInput, detect_format, import_stream
+from app.services.dashboard_metrics import get_dashboard_metrics
+from app.services.inventory import (
+    adjust_inventory,
+    combine_adjustments,
+    record_initial_stock,
+    set_inventory_quantity,
+)
+from app.services.export import EXPORTS, EXPORT_FORMATS, stream_export
+from app.services.page_cache import OWNER_DASHBOARD, OWNER_INVENTORY, OWNER_STAFF, cached_page
+from app.services.stock_alerts import current_low_stock
+from app.utils.security import PasswordPoolBusy, hash_password, run_password_task
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 # ======================================
@@ -17,51 +34,38 @@ templates = Jinja2Templates(directory="app/templates")
 # ======================================
 
 @router.get("/owner", response_class=HTMLResponse)
-def owner_dashboard(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request)
+def owner_dashboard(
+    request: Request,
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_read_request_user),
+):
     if not user or user.role != "owner":
         return RedirectResponse("/login", status_code=302)
 
-    # Core Metrics
-    total_leads = db.query(Contact).count()
-
-    active_conversations = db.query(Conversation).filter(
-        Conversation.status == "open"
-    ).count()
-
-    pending_bookings = db.query(Booking).filter(
-        Booking.status == "pending"
-    ).count()
-
-    confirmed_bookings = db.query(Booking).filter(
-        Booking.status == "confirmed"
-    ).count()
-
-    completed_bookings = db.query(Booking).filter(
-        Booking.status == "completed"
-    ).count()
-
-    # Inventory Metrics
-    items = db.query(Inventory).all()
-    total_inventory = len(items)
-    low_stock = len([i for i in items if i.quantity <= i.threshold])
-    healthy_stock = total_inventory - low_stock
-
-    return templates.TemplateResponse(
-        "owner_dashboard.html",
-        {
-            "request": request,
-            "user": user,
-            "total_leads": total_leads,
-            "active_conversations": active_conversations,
-            "pending_bookings": pending_bookings,
-            "confirmed_bookings": confirmed_bookings,
-            "completed_bookings": completed_bookings,
-            "low_stock": low_stock,
-            "healthy_stock": healthy_stock,
-            "total_inventory": total_inventory
-        }
-    )
+    def render():
+        # Core + Inventory Metrics
+        metrics = get_dashboard_metrics(db)
+        low_stock_items = current_low_stock(db)
+        metrics["low_stock"] = len(low_stock_items)
+
+        return templates.TemplateResponse(
+            "owner_dashboard.html",
+            {
+                "request": request,
+                "user": user,
+                "total_leads": metrics["total_leads"],
+                "active_conversations": metrics["active_conversations"],
+                "pending_bookings": metrics["pending_bookings"],
+                "confirmed_bookings": metrics["confirmed_bookings"],
+                "completed_bookings": metrics["completed_bookings"],
+                "low_stock": metrics["low_stock"],
+                "healthy_stock": metrics["total_inventory"] - metrics["low_stock"],
+                "total_inventory": metrics["total_inventory"],
+                "low_stock_items": low_stock_items,
+            }
+        )
+
+    return cached_page(request, user, db, OWNER_DASHBOARD, render)
 
 
 # ======================================
@@ -69,45 +73,67 @@ def owner_dashboard(request: Request, db: Session = Depends(get_db)):
 # ======================================
 
 @router.get("/owner/staff", response_class=HTMLResponse)
-def manage_staff(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request)
+def manage_staff(
+    request: Request,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_request_user),
+):
     if not user or user.role != "owner":
         return RedirectResponse("/login", status_code=302)
 
-    staff_members = db.query(User).filter(User.role == "staff").all()
+    def render():
+        staff_members = db.query(User).filter(User.role == "staff").all()
 
-    return templates.TemplateResponse(
-        "owner_staff.html",
-        {
-            "request": request,
-            "user": user,
-            "staff_members": staff_members
-        }
-    )
+        return templates.TemplateResponse(
+            "owner_staff.html",
+            {
+                "request": request,
+                "user": user,
+                "staff_members": staff_members
+            }
+        )
+
+    return cached_page(request, user, db, OWNER_STAFF, render)
 
 
 @router.post("/owner/staff/add")
-def add_staff(
+async def add_staff(
     request: Request,
     name: str = Form(...),
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_async_request_user),
 ):
-    user = get_current_user(request)
     if not user or user.role != "owner":
         return RedirectResponse("/login", status_code=302)
 
+    try:
+        password_hash = await run_password_task(hash_password, password)
+    except PasswordPoolBusy:
+        staff_members = (await db.scalars(select(User).where(User.role == "staff"))).all()
+        return templates.TemplateResponse(
+            "owner_staff.html",
+            {
+                "request": request,
+                "user": user,
+                "staff_members": staff_members,
+                "error": "The server is busy. Please try again in a moment.",
+            },
+            status_code=503,
+            headers={"Retry-After": "1"},
+        )
+
     new_staff = User(
         name=name,
         username=username,
-        password_hash=hash_password(password),
+        password_hash=password_hash,
         role="staff",
         is_active=True
     )
 
     db.add(new_staff)
-    db.commit()
+    await db.commit()
 
     return RedirectResponse("/owner/staff", status_code=302)
 
@@ -117,21 +143,27 @@ def add_staff(
 # ======================================
 
 @router.get("/owner/inventory", response_class=HTMLResponse)
-def owner_inventory(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request)
+def owner_inventory(
+    request: Request,
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_request_user),
+):
     if not user or user.role != "owner":
         return RedirectResponse("/login", status_code=302)
 
-    items = db.query(Inventory).all()
+    def render():
+        items = db.query(Inventory).all()
 
-    return templates.TemplateResponse(
-        "owner_inventory.html",
-        {
-            "request": request,
-            "user": user,
-            "items": items
-        }
-    )
+        return templates.TemplateResponse(
+            "owner_inventory.html",
+            {
+                "request": request,
+                "user": user,
+                "items": items
+            }
+        )
+
+    return cached_page(request, user, db, OWNER_INVENTORY, render)
 
 
 @router.post("/owner/inventory/update")
@@ -139,32 +171,52 @@ def update_inventory(
     request: Request,
     item_id: int = Form(...),
     quantity: int = Form(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_request_user),
 ):
-    user = get_current_user(request)
     if not user or user.role != "owner":
         return RedirectResponse("/login", status_code=302)
 
-    item = db.query(Inventory).filter(
-        Inventory.id == item_id
-    ).first()
-
-    if item:
-        item.quantity = quantity
+    if set_inventory_quantity(db, item_id, quantity, user_id=user.id):
         db.commit()
+        pin_primary(request)
 
     return RedirectResponse("/owner/inventory", status_code=302)
 
 
+@router.post("/owner/inventory/adjust")
+def adjust_inventory_levels(
+    request: Request,
+    item_id: List[int] = Form(...),
+    delta: List[int] = Form(...),
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_request_user),
+):
+    if not user or user.role != "owner":
+        return RedirectResponse("/login", status_code=302)
+
+    adjustments = combine_adjustments(item_id, delta)
+    if adjustments is None:
+        return JSONResponse({"error": "Each item_id needs a matching delta"}, status_code=400)
+
+    levels, rejected = adjust_inventory(db, adjustments, user_id=user.id)
+    db.commit()
+    pin_primary(request)
+
+    if "application/json" in request.headers.get("accept", ""):
+        return {"items": [asdict(level) for level in levels], "rejected": rejected}
+    return RedirectResponse("/owner/inventory", status_code=302)
+
+
 @router.post("/owner/inventory/add")
 def add_inventory(
     request: Request,
     name: str = Form(...),
     quantity: int = Form(...),
     threshold: int = Form(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_request_user),
 ):
-    user = get_current_user(request)
     if not user or user.role != "owner":
         return RedirectResponse("/login", status_code=302)
 
@@ -175,6 +227,85 @@ def add_inventory(
     )
 
     db.add(new_item)
+    record_initial_stock(db, new_item, user_id=user.id)
     db.commit()
+    pin_primary(request)
 
     return RedirectResponse("/owner/inventory", status_code=302)
+
+
+# ======================================
+# BULK IMPORT
+# ======================================
+
+@router.post("/owner/import/{kind}")
+def bulk_import(
+    kind: str,
+    file: UploadFile = File(...),
+    format: str = Form(None),
+    user: CurrentUser = Depends(get_request_user),
+):
+    if not user or user.role != "owner":
+        return JSONResponse({"error": "Not authorized"}, status_code=403)
+
+    fmt = format or detect_format(file.filename)
+    if kind not in IMPORT_KINDS or fmt not in IMPORT_FORMATS:
+        return JSONResponse(
+            {"error": f"Import kind must be one of {', '.join(IMPORT_KINDS)}, format one of {', '.join(IMPORT_FORMATS)}"},
+            status_code=400,
+        )
+
+    # The upload is spooled to disk by Starlette and read back in batches.
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        progress = import_stream(kind, stream, fmt)
+    except MalformedInput as exc:
+        return JSONResponse({"error": f"Malformed {fmt} input: {exc}"}, status_code=400)
+    finally:
+        stream.detach()
+
+    return asdict(progress)
+
+
+# ======================================
+# EXPORTS
+# ======================================
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+@router.get("/owner/export/{kind}")
+def export(
+    kind: str,
+    format: str = "csv",
+    start: date = None,
+    end: date = None,
+    gzip: bool = False,
+    user: CurrentUser = Depends(get_request_user),
+):
+    if not user or user.role != "owner":
+        return JSONResponse({"error": "Not authorized"}, status_code=403)
+
+    if kind not in EXPORTS or format not in EXPORT_FORMATS:
+        return JSONResponse(
+            {"error": f"Export kind must be one of {', '.join(EXPORTS)}, format one of {', '.join(EXPORT_FORMATS)}"},
+            status_code=400,
+        )
+
+    filename = f"{kind}.{format}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        # Served as a .gz download rather than Content-Encoding, so the file
+        # stays compressed on disk.
+        media_type = "application/gzip"
+    else:
+        media_type = EXPORT_MEDIA_TYPES[format]
+
+    return StreamingResponse(
+        stream_export(kind, format, start, end, compress=gzip),
+        media_type=media_type,
+        headers=headers,
+    )
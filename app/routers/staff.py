@@ -1,15 +1,31 @@
 from fastapi import APIRouter, Depends, Request, Form
-from fastapi.responses import RedirectResponse, HTMLResponse
-from fastapi.templating import Jinja2Templates
+import asyncio
+import json
+from dataclasses import asdict
+from typing import List
+from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import Conversation, Message, Booking, Inventory
-from app.middleware import get_current_user
+from app.database import get_db, get_async_db, get_read_db, pin_primary
+from app.models import Contact, Conversation, Message, Inventory
+from app.middleware import CurrentUser, get_request_user, get_async_request_user, get_read_request_user
+from app.services.dashboard_metrics import get_dashboard_metrics
+from app.services.inventory import adjust_inventory, combine_adjustments, set_inventory_quantity
+from app.services.inbox import (
+    MESSAGE_PAGE_SIZE,
+    list_open_conversations,
+    mark_conversation_read,
+    message_window,
+)
+from app.services.page_cache import STAFF_DASHBOARD, STAFF_INBOX, cached_page
+from app.services.realtime import broker
+from app.services.search import search
 from app.services.whatsapp_service import send_whatsapp_message
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 # =========================
@@ -17,31 +33,31 @@ templates = Jinja2Templates(directory="app/templates")
 # =========================
 
 @router.get("/staff", response_class=HTMLResponse)
-def staff_dashboard(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request)
+def staff_dashboard(
+    request: Request,
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_read_request_user),
+):
     if not user or user.role != "staff":
         return RedirectResponse("/login", status_code=302)
 
-    open_conversations = db.query(Conversation).filter(
-        Conversation.status == "open"
-    ).count()
+    def render():
+        metrics = get_dashboard_metrics(db)
 
-    confirmed_bookings = db.query(Booking).filter(
-        Booking.status == "confirmed"
-    ).count()
+        inventory_items = db.query(Inventory).all()
 
-    inventory_items = db.query(Inventory).all()
+        return templates.TemplateResponse(
+            "staff_dashboard.html",
+            {
+                "request": request,
+                "user": user,
+                "open_conversations": metrics["active_conversations"],
+                "confirmed_bookings": metrics["confirmed_bookings"],
+                "inventory_items": inventory_items
+            }
+        )
 
-    return templates.TemplateResponse(
-        "staff_dashboard.html",
-        {
-            "request": request,
-            "user": user,
-            "open_conversations": open_conversations,
-            "confirmed_bookings": confirmed_bookings,
-            "inventory_items": inventory_items
-        }
-    )
+    return cached_page(request, user, db, STAFF_DASHBOARD, render)
 
 
 # =========================
@@ -49,21 +65,52 @@ def staff_dashboard(request: Request, db: Session = Depends(get_db)):
 # =========================
 
 @router.get("/staff/inbox", response_class=HTMLResponse)
-def staff_inbox(request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request)
+def staff_inbox(
+    request: Request,
+    cursor: str = None,
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_read_request_user),
+):
     if not user or user.role != "staff":
         return RedirectResponse("/login", status_code=302)
 
-    conversations = db.query(Conversation).filter(
-        Conversation.status == "open"
-    ).all()
+    def render():
+        conversations, next_cursor = list_open_conversations(db, cursor)
+
+        return templates.TemplateResponse(
+            "staff_inbox.html",
+            {
+                "request": request,
+                "user": user,
+                "conversations": conversations,
+                "next_cursor": next_cursor
+            }
+        )
+
+    return cached_page(request, user, db, STAFF_INBOX, render)
+
+
+# =========================
+# SEARCH
+# =========================
+
+@router.get("/staff/search", response_class=HTMLResponse)
+def staff_search(
+    request: Request,
+    q: str = "",
+    page: int = 1,
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_read_request_user),
+):
+    if not user or user.role != "staff":
+        return RedirectResponse("/login", status_code=302)
 
     return templates.TemplateResponse(
-        "staff_inbox.html",
+        "staff_search.html",
         {
             "request": request,
             "user": user,
-            "conversations": conversations
+            "results": search(db, q, page),
         }
     )
 
@@ -73,8 +120,12 @@ def staff_inbox(request: Request, db: Session = Depends(get_db)):
 # =========================
 
 @router.get("/staff/conversation/{conversation_id}", response_class=HTMLResponse)
-def view_conversation(conversation_id: int, request: Request, db: Session = Depends(get_db)):
-    user = get_current_user(request)
+def view_conversation(
+    conversation_id: int,
+    request: Request,
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_read_request_user),
+):
     if not user or user.role != "staff":
         return RedirectResponse("/login", status_code=302)
 
@@ -85,9 +136,10 @@ def view_conversation(conversation_id: int, request: Request, db: Session = Depe
     if not conversation:
         return RedirectResponse("/staff/inbox", status_code=302)
 
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).order_by(Message.timestamp).all()
+    if conversation.unread_count:
+        mark_conversation_read(db, conversation_id)
+
+    messages, older_cursor = message_window(db, conversation_id)
 
     return templates.TemplateResponse(
         "conversation.html",
@@ -95,11 +147,72 @@ def view_conversation(conversation_id: int, request: Request, db: Session = Depe
             "request": request,
             "user": user,
             "messages": messages,
+            "older_cursor": older_cursor,
             "conversation_id": conversation_id
         }
     )
 
 
+@router.get("/staff/conversation/{conversation_id}/messages")
+def conversation_messages(
+    conversation_id: int,
+    before: str = None,
+    limit: int = MESSAGE_PAGE_SIZE,
+    db: Session = Depends(get_read_db),
+    user: CurrentUser = Depends(get_read_request_user),
+):
+    if not user or user.role != "staff":
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+
+    messages, older_cursor = message_window(db, conversation_id, before, limit)
+
+    return {
+        "messages": [
+            {
+                "id": m.id,
+                "sender": m.sender,
+                "body": m.body,
+                "timestamp": m.timestamp.isoformat() if m.timestamp else None,
+            }
+            for m in messages
+        ],
+        "older_cursor": older_cursor,
+    }
+
+
+# =========================
+# LIVE EVENTS (SSE)
+# =========================
+
+@router.get("/staff/events")
+async def staff_events(
+    request: Request,
+    user: CurrentUser = Depends(get_async_request_user),
+):
+    if not user or user.role != "staff":
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+
+    async def event_stream():
+        queue = broker.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {payload['type']}\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # =========================
 # STAFF REPLY
 # =========================
@@ -109,17 +222,21 @@ async def reply_to_conversation(
     conversation_id: int,
     request: Request,
     message: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_async_request_user),
 ):
-    user = get_current_user(request)
     if not user or user.role != "staff":
         return RedirectResponse("/login", status_code=302)
 
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id
-    ).first()
+    # Fetch the phone explicitly; lazy-loading conversation.contact is not
+    # available on an AsyncSession.
+    phone = await db.scalar(
+        select(Contact.phone)
+        .join(Conversation, Conversation.contact_id == Contact.id)
+        .where(Conversation.id == conversation_id)
+    )
 
-    if not conversation:
+    if not phone:
         return RedirectResponse("/staff/inbox", status_code=302)
 
     # Save message in DB
@@ -130,11 +247,12 @@ async def reply_to_conversation(
             body=message
         )
     )
-    db.commit()
+    await db.commit()
+    pin_primary(request)
 
     # Send via WhatsApp
     await send_whatsapp_message(
-        conversation.contact.phone,
+        phone,
         message
     )
 
@@ -150,18 +268,38 @@ def update_inventory(
     request: Request,
     item_id: int = Form(...),
     quantity: int = Form(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_request_user),
 ):
-    user = get_current_user(request)
     if not user or user.role != "staff":
         return RedirectResponse("/login", status_code=302)
 
-    item = db.query(Inventory).filter(
-        Inventory.id == item_id
-    ).first()
-
-    if item:
-        item.quantity = quantity
+    if set_inventory_quantity(db, item_id, quantity, user_id=user.id):
         db.commit()
+        pin_primary(request)
+
+    return RedirectResponse("/staff", status_code=302)
+
+
+@router.post("/staff/inventory/adjust")
+def adjust_inventory_levels(
+    request: Request,
+    item_id: List[int] = Form(...),
+    delta: List[int] = Form(...),
+    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(get_request_user),
+):
+    if not user or user.role != "staff":
+        return RedirectResponse("/login", status_code=302)
+
+    adjustments = combine_adjustments(item_id, delta)
+    if adjustments is None:
+        return JSONResponse({"error": "Each item_id needs a matching delta"}, status_code=400)
+
+    levels, rejected = adjust_inventory(db, adjustments, user_id=user.id)
+    db.commit()
+    pin_primary(request)
 
+    if "application/json" in request.headers.get("accept", ""):
+        return {"items": [asdict(level) for level in levels], "rejected": rejected}
     return RedirectResponse("/staff", status_code=302)
@@ -0,0 +1,201 @@
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import false, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Booking, Workspace
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = {"Mon": 0, "Tue": 1, "Wed": 2, "Thu": 3, "Fri": 4, "Sat": 5, "Sun": 6}
+BOOKING_LOCK_NAMESPACE = 72_310_010
+MAX_RANGE_DAYS = 31
+
+
+def naive(value: datetime) -> datetime:
+    # Booking times are written as naive local datetimes; Postgres hands
+    # them back tz-aware, so compare everything naive.
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def workspace_now(workspace: Workspace) -> datetime:
+    # The workspace's wall-clock time, naive like the booking times.
+    try:
+        zone = ZoneInfo(workspace.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown workspace timezone {workspace.timezone!r}; using server time")
+        return datetime.now()
+    return naive(datetime.now(zone))
+
+
+# =========================
+# COMPILED SCHEDULE
+# =========================
+
+@dataclass(frozen=True)
+class CompiledSchedule:
+    weekdays: frozenset
+    opens: time
+    closes: time
+    duration: timedelta
+
+    def accepts(self, start: datetime) -> bool:
+        # Same rule as slot_starts: the whole appointment fits in the day.
+        return (
+            start.weekday() in self.weekdays
+            and self.opens <= start.time()
+            and start + self.duration <= datetime.combine(start.date(), self.closes)
+        )
+
+    def slot_starts(self, day: date):
+        if day.weekday() not in self.weekdays:
+            return []
+        slots = []
+        start = datetime.combine(day, self.opens)
+        last = datetime.combine(day, self.closes)
+        while start + self.duration <= last:
+            slots.append(start)
+            start += self.duration
+        return slots
+
+
+_compiled = {}
+
+
+def compile_schedule(workspace: Workspace) -> CompiledSchedule:
+    # Keyed on the raw schedule fields, so an edited workspace recompiles
+    # without explicit invalidation.
+    key = (
+        workspace.active_days,
+        workspace.active_hours_start,
+        workspace.active_hours_end,
+        workspace.default_service_duration_minutes,
+    )
+    schedule = _compiled.get(key)
+    if schedule is None:
+        schedule = CompiledSchedule(
+            weekdays=frozenset(
+                WEEKDAYS[d.strip()] for d in workspace.active_days.split(",") if d.strip() in WEEKDAYS
+            ),
+            opens=datetime.strptime(workspace.active_hours_start, "%H:%M").time(),
+            closes=datetime.strptime(workspace.active_hours_end, "%H:%M").time(),
+            duration=timedelta(minutes=workspace.default_service_duration_minutes),
+        )
+        _compiled[key] = schedule
+    return schedule
+
+
+# =========================
+# INTERVAL INDEX
+# =========================
+
+class IntervalIndex:
+    # Booked [start, end) intervals bucketed by start day, each bucket kept
+    # sorted by start so overlap checks are a bisect plus a short scan.
+
+    def __init__(self):
+        self._days = defaultdict(list)
+        self._longest = timedelta(0)
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._days.values())
+
+    def add(self, start: datetime, end: datetime):
+        start, end = naive(start), naive(end)
+        bucket = self._days[start.date()]
+        bucket.insert(bisect_left(bucket, (start, end)), (start, end))
+        self._longest = max(self._longest, end - start)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        # Any interval that could overlap starts after start - longest, so
+        # only those buckets (usually one or two days) are examined.
+        day = (start - self._longest).date()
+        while day <= end.date():
+            bucket = self._days.get(day)
+            if bucket:
+                i = bisect_left(bucket, (end,))
+                while i > 0:
+                    i -= 1
+                    booked_start, booked_end = bucket[i]
+                    if booked_end > start:
+                        return True
+                    if booked_start + self._longest <= start:
+                        break
+            day += timedelta(days=1)
+        return False
+
+    def free_slots(self, schedule: CompiledSchedule, first_day: date, last_day: date, now: datetime = None):
+        slots = {}
+        day = first_day
+        while day <= last_day:
+            slots[day] = [
+                start for start in schedule.slot_starts(day)
+                if (now is None or start > now) and not self.overlaps(start, start + schedule.duration)
+            ]
+            day += timedelta(days=1)
+        return slots
+
+
+def blocking_bookings():
+    return Booking.status != "cancelled"
+
+
+async def load_interval_index(db: AsyncSession, start: datetime, end: datetime) -> IntervalIndex:
+    rows = await db.execute(
+        select(Booking.start_time, Booking.end_time).where(
+            blocking_bookings(),
+            Booking.start_time < end,
+            Booking.end_time > start,
+        )
+    )
+    index = IntervalIndex()
+    for booked_start, booked_end in rows:
+        index.add(booked_start, booked_end)
+    return index
+
+
+async def free_slots(db: AsyncSession, workspace: Workspace, first_day: date, days: int):
+    days = max(1, min(days, MAX_RANGE_DAYS))
+    last_day = first_day + timedelta(days=days - 1)
+    schedule = compile_schedule(workspace)
+
+    index = await load_interval_index(
+        db,
+        datetime.combine(first_day, time.min),
+        datetime.combine(last_day + timedelta(days=1), time.min),
+    )
+    return index.free_slots(schedule, first_day, last_day, now=workspace_now(workspace))
+
+
+async def reserve_slot(db: AsyncSession, start: datetime, end: datetime) -> bool:
+    # Must run in the same transaction that inserts the booking, before it
+    # writes anything else. Competing bookings are serialized until commit,
+    # so the overlap check and the insert are atomic: on Postgres by a
+    # per-day advisory lock, on SQLite by taking the database write lock up
+    # front (a no-op UPDATE, the equivalent of BEGIN IMMEDIATE) instead of
+    # letting two deferred transactions both read "no conflict".
+    if db.sync_session.get_bind().dialect.name == "postgresql":
+        day = start.date()
+        while day <= end.date():
+            await db.execute(
+                select(func.pg_advisory_xact_lock(BOOKING_LOCK_NAMESPACE, day.toordinal()))
+            )
+            day += timedelta(days=1)
+    else:
+        await db.execute(
+            update(Booking).where(false()).values(status=Booking.status).execution_options(synchronize_session=False)
+        )
+
+    conflict = await db.scalar(
+        select(Booking.id).where(
+            blocking_bookings(),
+            Booking.start_time < end,
+            Booking.end_time > start,
+        ).limit(1)
+    )
+    return conflict is None
@@ -0,0 +1,320 @@
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from itertools import islice
+
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, upsert_insert
+from app.models import Contact, Conversation, Message, Ticket, utcnow
+from app.services.dashboard_metrics import apply_counter_deltas
+from app.services.inbox import PREVIEW_LENGTH
+from app.services.page_cache import touch
+from app.utils.phone import normalize_phone
+
+logger = logging.getLogger(__name__)
+
+IMPORT_KINDS = ("contacts", "tickets", "messages")
+IMPORT_FORMATS = ("csv", "ndjson")
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass
+class ImportProgress:
+    rows: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    batches: int = 0
+
+
+class MalformedInput(ValueError):
+    pass
+
+
+def _check_text(record: dict, line: int):
+    # Postgres text columns can't store NUL characters.
+    for key, value in record.items():
+        if isinstance(value, str) and "\x00" in value:
+            raise MalformedInput(f"line {line}: {key} contains a NUL character")
+
+
+def _csv_records(stream):
+    reader = csv.DictReader(stream, strict=True)
+    try:
+        for record in reader:
+            _check_text(record, reader.line_num)
+            yield record
+    except csv.Error as e:
+        raise MalformedInput(f"line {reader.line_num}: {e}") from e
+
+
+def _ndjson_records(stream):
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise MalformedInput(f"line {number}: {e}") from e
+        if not isinstance(record, dict):
+            raise MalformedInput(f"line {number}: expected a JSON object")
+        # Same shape as a CSV row: text values, missing ones as None.
+        for key, value in record.items():
+            if isinstance(value, (dict, list)):
+                raise MalformedInput(f"line {number}: {key} must be a string")
+            if value is not None and not isinstance(value, str):
+                record[key] = str(value)
+        _check_text(record, number)
+        yield record
+
+
+def iter_records(stream, fmt: str):
+    # `stream` is a text stream; both readers pull one line at a time.
+    # Decoding happens as lines are read, so bad bytes surface here too.
+    records = _csv_records(stream) if fmt == "csv" else _ndjson_records(stream)
+    try:
+        yield from records
+    except UnicodeDecodeError as e:
+        raise MalformedInput(f"input is not valid UTF-8: {e}") from e
+
+
+def batched(records, size: int):
+    records = iter(records)
+    while batch := list(islice(records, size)):
+        yield batch
+
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    # Naive timestamps are taken as UTC, matching utcnow().
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError as e:
+        raise MalformedInput(f"invalid timestamp {value!r}") from e
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _ensure_contacts(db: Session, records):
+    # Normalizes and dedupes phones, inserts missing contacts and their
+    # conversations with executemany, and returns ({phone: (contact_id,
+    # conversation_id)}, contacts created) for the batch.
+    names = {}
+    for record in records:
+        phone = normalize_phone(record.get("phone") or "")
+        if phone:
+            names.setdefault(phone, (record.get("name") or "").strip() or phone)
+
+    if not names:
+        return {}, 0
+
+    deltas = Counter()
+    created = db.execute(
+        upsert_insert(db, Contact).on_conflict_do_nothing(index_elements=["phone"]).returning(Contact.id),
+        [{"name": name, "phone": phone} for phone, name in names.items()],
+    ).all()
+    deltas["total_leads"] = len(created)
+
+    contact_ids = dict(
+        db.execute(select(Contact.phone, Contact.id).where(Contact.phone.in_(names))).all()
+    )
+    opened = db.execute(
+        upsert_insert(db, Conversation)
+        .on_conflict_do_nothing(index_elements=["contact_id"])
+        .returning(Conversation.id),
+        [{"contact_id": contact_id} for contact_id in contact_ids.values()],
+    ).all()
+    deltas["active_conversations"] = len(opened)
+
+    conversation_ids = dict(
+        db.execute(
+            select(Conversation.contact_id, Conversation.id)
+            .where(Conversation.contact_id.in_(contact_ids.values()))
+        ).all()
+    )
+    apply_counter_deltas(db.connection(), deltas)
+
+    ids = {
+        phone: (contact_id, conversation_ids[contact_id])
+        for phone, contact_id in contact_ids.items()
+    }
+    return ids, len(created)
+
+
+def _resolve(db: Session, records, progress: ImportProgress):
+    ids, _ = _ensure_contacts(db, records)
+    resolved = []
+    for record in records:
+        match = ids.get(normalize_phone(record.get("phone") or ""))
+        if match:
+            resolved.append((record, match))
+        else:
+            progress.invalid += 1
+    return resolved
+
+
+def import_batch(db: Session, kind: str, records, progress: ImportProgress):
+    if kind == "contacts":
+        ids, created = _ensure_contacts(db, records)
+        valid = sum(1 for r in records if normalize_phone(r.get("phone") or ""))
+        progress.inserted += created
+        progress.duplicates += valid - created
+        progress.invalid += len(records) - valid
+
+    elif kind == "tickets":
+        rows = []
+        for record, (contact_id, conversation_id) in _resolve(db, records, progress):
+            if not record.get("ticket_number"):
+                progress.invalid += 1
+                continue
+            rows.append({
+                "ticket_number": record["ticket_number"],
+                "form_type": record.get("form_type") or "query",
+                "status": record.get("status") or "submitted",
+                "contact_id": contact_id,
+                "conversation_id": conversation_id,
+                "created_at": parse_timestamp(record.get("created_at")) or utcnow(),
+            })
+        if rows:
+            inserted = db.execute(
+                upsert_insert(db, Ticket)
+                .on_conflict_do_nothing(index_elements=["ticket_number"])
+                .returning(Ticket.id),
+                rows,
+            ).all()
+            progress.inserted += len(inserted)
+            progress.duplicates += len(rows) - len(inserted)
+
+    elif kind == "messages":
+        rows = []
+        latest = {}
+        for record, (contact_id, conversation_id) in _resolve(db, records, progress):
+            if not record.get("body"):
+                progress.invalid += 1
+                continue
+            row = {
+                "conversation_id": conversation_id,
+                "sender": record.get("sender") or "client",
+                "body": record["body"],
+                "timestamp": parse_timestamp(record.get("timestamp")) or utcnow(),
+            }
+            rows.append(row)
+            if conversation_id not in latest or row["timestamp"] >= latest[conversation_id]["timestamp"]:
+                latest[conversation_id] = row
+
+        if rows:
+            db.execute(Message.__table__.insert(), rows)
+            progress.inserted += len(rows)
+            _advance_activity(db, latest.values())
+
+    if records:
+        touch(db, "contacts", "conversations")
+    db.commit()
+    progress.rows += len(records)
+    progress.batches += 1
+
+
+def _advance_activity(db: Session, rows):
+    # Historical messages only move the inbox preview forward (or fill it in
+    # for conversations that have none yet); they never count as unread.
+    table = Conversation.__table__
+    db.execute(
+        update(table)
+        .where(
+            table.c.id == bindparam("conversation"),
+            or_(
+                table.c.last_message_at <= bindparam("ts"),
+                table.c.last_message_preview.is_(None),
+            ),
+        )
+        .values(
+            last_message_at=bindparam("ts"),
+            last_message_preview=bindparam("preview"),
+        ),
+        [
+            {
+                "conversation": row["conversation_id"],
+                "ts": row["timestamp"],
+                "preview": row["body"][:PREVIEW_LENGTH],
+            }
+            for row in rows
+        ],
+    )
+
+
+def import_stream(kind: str, stream, fmt: str, batch_size: int = DEFAULT_BATCH_SIZE, on_progress=None):
+    # Reads, writes and commits one batch at a time, so memory use depends
+    # on batch_size rather than on the size of the input.
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(IMPORT_KINDS)}")
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(IMPORT_FORMATS)}")
+
+    progress = ImportProgress()
+    db = SessionLocal()
+    try:
+        for records in batched(iter_records(stream, fmt), batch_size):
+            import_batch(db, kind, records, progress)
+            logger.info(f"Imported {kind}: {asdict(progress)}")
+            if on_progress:
+                on_progress(progress)
+    finally:
+        db.close()
+    return progress
+
+
+def detect_format(filename: str, default: str = "csv") -> str:
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if filename and filename.lower().endswith(".csv"):
+        return "csv"
+    return default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-import contacts, tickets or messages.")
+    parser.add_argument("kind", choices=IMPORT_KINDS)
+    parser.add_argument("path", help="CSV or NDJSON file, or - for stdin")
+    parser.add_argument("--format", choices=IMPORT_FORMATS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+
+    def report(progress):
+        print(
+            f"\r{progress.rows} rows, {progress.inserted} inserted, "
+            f"{progress.duplicates} duplicates, {progress.invalid} invalid",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    if args.path == "-":
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    else:
+        stream = open(args.path, encoding="utf-8", newline="")
+
+    with stream:
+        try:
+            progress = import_stream(args.kind, stream, fmt, args.batch_size, report)
+        except MalformedInput as e:
+            print(file=sys.stderr)
+            parser.exit(1, f"Malformed {fmt} input: {e}\n")
+
+    print(file=sys.stderr)
+    print(json.dumps(asdict(progress)))
+
+
+if __name__ == "__main__":
+    main()
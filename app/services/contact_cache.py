@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import CONTACT_CACHE_SIZE
+
+PENDING_KEY = "contact_cache_pending"
+
+
+class ContactCache:
+    # LRU map of normalized phone -> (contact_id, conversation_id). Contacts
+    # and their conversation are never re-keyed by the app, so entries only
+    # leave by eviction (or clear(), after the phone dedupe migration).
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, phone: str):
+        with self._lock:
+            ids = self._entries.get(phone)
+            if ids is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(phone)
+            self.hits += 1
+            return ids
+
+    def put(self, phone: str, contact_id: int, conversation_id: int):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[phone] = (contact_id, conversation_id)
+            self._entries.move_to_end(phone)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+contact_cache = ContactCache(CONTACT_CACHE_SIZE)
+
+
+def remember(session: Session, phone: str, contact_id: int, conversation_id: int):
+    # Rows this transaction created only become visible to other requests
+    # once it commits, so they are cached from the after_commit hook.
+    session.info.setdefault(PENDING_KEY, []).append((phone, contact_id, conversation_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed(session):
+    for entry in session.info.pop(PENDING_KEY, ()):
+        contact_cache.put(*entry)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,162 @@
+from collections import Counter
+
+from sqlalchemy import bindparam, event, false, func, inspect, select, text, update
+from sqlalchemy.orm import Session
+
+from app.config import DASHBOARD_COUNTERS
+from app.models import Booking, Contact, Conversation, DashboardCounter, Inventory
+
+COUNTER_NAMES = (
+    "total_leads",
+    "active_conversations",
+    "pending_bookings",
+    "confirmed_bookings",
+    "completed_bookings",
+    "total_inventory",
+    "low_stock",
+)
+
+BOOKING_STATUS_COUNTERS = {
+    "pending": "pending_bookings",
+    "confirmed": "confirmed_bookings",
+    "completed": "completed_bookings",
+}
+
+
+def _count(model, *criteria):
+    return select(func.count(model.id)).where(*criteria).scalar_subquery()
+
+
+def aggregate_metrics_query():
+    # Every count is a scalar subquery of one SELECT: a single round trip,
+    # and low stock is evaluated in SQL rather than over loaded rows.
+    return select(
+        _count(Contact).label("total_leads"),
+        _count(Conversation, Conversation.status == "open").label("active_conversations"),
+        _count(Booking, Booking.status == "pending").label("pending_bookings"),
+        _count(Booking, Booking.status == "confirmed").label("confirmed_bookings"),
+        _count(Booking, Booking.status == "completed").label("completed_bookings"),
+        _count(Inventory).label("total_inventory"),
+        _count(Inventory, Inventory.quantity <= Inventory.threshold).label("low_stock"),
+    )
+
+
+def compute_dashboard_metrics(db: Session) -> dict:
+    return dict(db.execute(aggregate_metrics_query()).mappings().one())
+
+
+def get_dashboard_metrics(db: Session) -> dict:
+    if DASHBOARD_COUNTERS:
+        rows = db.execute(select(DashboardCounter.name, DashboardCounter.value)).all()
+        if rows:
+            metrics = dict.fromkeys(COUNTER_NAMES, 0)
+            metrics.update(rows)
+            return metrics
+    return compute_dashboard_metrics(db)
+
+
+def _lock_counters(db: Session):
+    # Waits for writers that already applied a delta to commit, and makes
+    # later writers wait at their delta until the rebuild commits. The
+    # counts below then see exactly the changes whose deltas are in.
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE dashboard_counters IN EXCLUSIVE MODE"))
+    else:
+        # SQLite has one writer at a time; take the write lock before reading.
+        db.execute(update(DashboardCounter).where(false()).values(value=DashboardCounter.value))
+
+
+def rebuild_dashboard_counters(db: Session):
+    # Run once when turning DASHBOARD_COUNTERS on, while the app may be
+    # serving: python -m app.services.dashboard_metrics. Until then the
+    # dashboard aggregates the source tables.
+    _lock_counters(db)
+    metrics = compute_dashboard_metrics(db)
+    existing = set(db.scalars(select(DashboardCounter.name)))
+
+    for name in COUNTER_NAMES:
+        if name in existing:
+            db.execute(
+                update(DashboardCounter)
+                .where(DashboardCounter.name == name)
+                .values(value=metrics[name])
+            )
+        else:
+            db.add(DashboardCounter(name=name, value=metrics[name]))
+    db.commit()
+
+
+# =========================
+# INCREMENTAL MAINTENANCE
+# =========================
+
+_apply_deltas = (
+    update(DashboardCounter.__table__)
+    .where(DashboardCounter.__table__.c.name == bindparam("counter"))
+    .values(value=DashboardCounter.__table__.c.value + bindparam("delta"))
+)
+
+
+def apply_counter_deltas(connection, deltas):
+    # For writers that bypass the ORM (bulk or Core statements). Must run on
+    # the same connection and transaction as the change itself.
+    if not DASHBOARD_COUNTERS:
+        return
+    params = [{"counter": name, "delta": delta} for name, delta in deltas.items() if delta]
+    if params:
+        connection.execute(_apply_deltas, params)
+
+
+def _value(obj, key: str, committed: bool):
+    if committed:
+        history = inspect(obj).attrs[key].history
+        if history.deleted:
+            return history.deleted[0]
+    return getattr(obj, key)
+
+
+def _counters_for(obj, committed: bool = False):
+    if isinstance(obj, Contact):
+        yield "total_leads"
+    elif isinstance(obj, Conversation):
+        if _value(obj, "status", committed) == "open":
+            yield "active_conversations"
+    elif isinstance(obj, Booking):
+        name = BOOKING_STATUS_COUNTERS.get(_value(obj, "status", committed))
+        if name:
+            yield name
+    elif isinstance(obj, Inventory):
+        yield "total_inventory"
+        if _value(obj, "quantity", committed) <= _value(obj, "threshold", committed):
+            yield "low_stock"
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_dashboard_counters(session, flush_context):
+    # Attribute history is still intact in after_flush, so dirty rows can be
+    # compared against their committed values.
+    if not DASHBOARD_COUNTERS:
+        return
+
+    deltas = Counter()
+    for obj in session.new:
+        deltas.update(_counters_for(obj))
+    for obj in session.deleted:
+        deltas.subtract(_counters_for(obj))
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            deltas.subtract(_counters_for(obj, committed=True))
+            deltas.update(_counters_for(obj))
+
+    apply_counter_deltas(session.connection(), deltas)
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rebuild_dashboard_counters(db)
+    finally:
+        db.close()
+    print("Rebuilt dashboard counters.")
@@ -0,0 +1,126 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models import Booking, Contact, Conversation, Message, Ticket
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_BATCH_SIZE = 1000
+# Encoded rows are buffered up to roughly this many bytes per chunk so the
+# response isn't sent one tiny write per row.
+CHUNK_SIZE = 64 * 1024
+
+
+def _leads():
+    return select(
+        Contact.id, Contact.name, Contact.phone, Contact.created_at,
+    ).order_by(Contact.id), Contact.created_at
+
+
+def _bookings():
+    return select(
+        Booking.id, Contact.name, Contact.phone, Booking.service_type,
+        Booking.start_time, Booking.end_time, Booking.status, Booking.created_at,
+    ).join(Contact, Contact.id == Booking.contact_id).order_by(Booking.id), Booking.start_time
+
+
+def _tickets():
+    return select(
+        Ticket.ticket_number, Ticket.form_type, Ticket.status,
+        Contact.name, Contact.phone, Ticket.created_at,
+    ).join(Contact, Contact.id == Ticket.contact_id).order_by(Ticket.id), Ticket.created_at
+
+
+def _conversations():
+    # Ordered along ix_messages_conversation_id_timestamp so each
+    # conversation's log comes out contiguous and in order.
+    return select(
+        Message.conversation_id, Contact.name, Contact.phone,
+        Message.sender, Message.body, Message.timestamp,
+    ).join(
+        Conversation, Conversation.id == Message.conversation_id
+    ).join(
+        Contact, Contact.id == Conversation.contact_id
+    ).order_by(Message.conversation_id, Message.timestamp, Message.id), Message.timestamp
+
+
+EXPORTS = {
+    "leads": _leads,
+    "bookings": _bookings,
+    "tickets": _tickets,
+    "conversations": _conversations,
+}
+
+
+def export_query(kind: str, start: date = None, end: date = None):
+    stmt, column = EXPORTS[kind]()
+    if start:
+        stmt = stmt.where(column >= datetime.combine(start, time.min, timezone.utc))
+    if end:
+        # Inclusive of the whole end day.
+        stmt = stmt.where(column < datetime.combine(end + timedelta(days=1), time.min, timezone.utc))
+    return stmt
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _encode(rows, columns, fmt):
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow([_value(v) for v in row])
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    else:
+        for row in rows:
+            buffer.write(json.dumps({c: _value(v) for c, v in zip(columns, row)}))
+            buffer.write("\n")
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(kind: str, fmt: str, start: date = None, end: date = None, compress: bool = False):
+    # Runs after the request's own session is gone, so it owns one. yield_per
+    # turns on server-side cursors where the driver has them and fetches
+    # EXPORT_BATCH_SIZE rows at a time.
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            export_query(kind, start, end).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        chunks = (
+            chunk.encode("utf-8")
+            for chunk in _encode(result, list(result.keys()), fmt)
+        )
+        yield from (_gzip(chunks) if compress else chunks)
+    finally:
+        db.close()
@@ -0,0 +1,267 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import and_, or_, select, update
+
+from app.config import WEBHOOK_BATCH_SIZE, WEBHOOK_MAX_ATTEMPTS, WEBHOOK_POLL_INTERVAL
+from app.database import new_async_session, upsert_insert
+from app.models import Booking, Contact, Conversation, InboundMessage, Message, utcnow
+from app.utils.phone import normalize_phone
+from app.utils.security import hash_secret_code
+from app.services.contact_cache import contact_cache, remember
+from app.services.whatsapp_service import send_whatsapp_message
+
+logger = logging.getLogger(__name__)
+
+# A claimed row whose worker died is handed out again after this long.
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+_wake = asyncio.Event()
+_worker_task = None
+
+
+async def enqueue_inbound(db, message_sid: str, from_number: str, body: str):
+    # Returns the new row id, or None when Twilio is retrying a MessageSid
+    # that is already queued.
+    row_id = await db.scalar(
+        upsert_insert(db.sync_session, InboundMessage)
+        .values(message_sid=message_sid, from_number=from_number, body=body)
+        .on_conflict_do_nothing(index_elements=["message_sid"])
+        .returning(InboundMessage.id)
+    )
+    await db.commit()
+    return row_id
+
+
+def wake_worker():
+    _wake.set()
+
+
+async def claim_batch(db, limit: int = WEBHOOK_BATCH_SIZE, ids=None):
+    # Marks up to `limit` rows as processing in one statement. SKIP LOCKED
+    # lets several workers (or processes) claim disjoint batches on
+    # Postgres; SQLite ignores it and serializes writers instead.
+    now = utcnow()
+    claimable = select(InboundMessage.id).where(
+        or_(
+            InboundMessage.status == "pending",
+            and_(
+                InboundMessage.status == "processing",
+                InboundMessage.claimed_at < now - CLAIM_TIMEOUT,
+            ),
+        )
+    )
+    if ids is not None:
+        claimable = claimable.where(InboundMessage.id.in_(ids))
+    claimable = claimable.order_by(InboundMessage.id).limit(limit).with_for_update(skip_locked=True)
+
+    result = await db.execute(
+        update(InboundMessage)
+        .where(InboundMessage.id.in_(claimable.scalar_subquery()))
+        .values(
+            status="processing",
+            claimed_at=now,
+            attempts=InboundMessage.attempts + 1,
+        )
+        .returning(
+            InboundMessage.id,
+            InboundMessage.from_number,
+            InboundMessage.body,
+            InboundMessage.attempts,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    rows = sorted(result.all(), key=lambda row: row.id)
+    await db.commit()
+    return rows
+
+
+async def process_batch(db, rows) -> list:
+    # Resolves senders through the contact cache, loads the misses and the
+    # batch's pending bookings up front, then writes every message and status
+    # change in a single commit. Returns the (phone, body) replies for the
+    # caller to send once it is past its failure handling.
+    claimed = set(
+        await db.scalars(
+            select(InboundMessage.id).where(
+                InboundMessage.id.in_([row.id for row in rows]),
+                InboundMessage.status == "processing",
+            )
+        )
+    )
+    # Rows already settled by an earlier attempt must not be written twice.
+    rows = [row for row in rows if row.id in claimed]
+    if not rows:
+        return []
+
+    phones = {row.id: normalize_phone(row.from_number) for row in rows}
+
+    resolved = {}
+    for phone in set(phones.values()) - {""}:
+        cached = contact_cache.get(phone)
+        if cached:
+            resolved[phone] = cached
+
+    missing = set(phones.values()) - set(resolved) - {""}
+    if missing:
+        result = await db.execute(
+            select(Contact.phone, Contact.id, Conversation.id)
+            .outerjoin(Conversation, Conversation.contact_id == Contact.id)
+            .where(Contact.phone.in_(missing))
+        )
+        for phone, contact_id, conversation_id in result:
+            resolved[phone] = (contact_id, conversation_id)
+
+    bookings = {}
+    contact_ids = [contact_id for contact_id, _ in resolved.values()]
+    for booking in await db.scalars(
+        select(Booking)
+        .where(Booking.contact_id.in_(contact_ids), Booking.status == "pending")
+        .order_by(Booking.id)
+    ):
+        bookings.setdefault(booking.contact_id, booking)
+
+    replies = []
+    statuses = {}
+    for row in rows:
+        phone = phones[row.id]
+        if phone not in resolved:
+            statuses[row.id] = "ignored"
+            continue
+
+        contact_id, conversation_id = resolved[phone]
+        if conversation_id is None:
+            conversation = Conversation(contact_id=contact_id)
+            db.add(conversation)
+            await db.flush()
+            conversation_id = conversation.id
+            resolved[phone] = (contact_id, conversation_id)
+        remember(db.sync_session, phone, contact_id, conversation_id)
+
+        db.add(Message(conversation_id=conversation_id, sender="client", body=row.body))
+        statuses[row.id] = "done"
+
+        booking = bookings.get(contact_id)
+        if booking:
+            if hash_secret_code(row.body) == booking.secret_code_hash:
+                booking.status = "confirmed"
+                del bookings[contact_id]
+                replies.append((phone, "Your booking has been confirmed successfully."))
+            else:
+                replies.append((phone, "Invalid secret code. Please try again."))
+
+    await db.flush()
+    now = utcnow()
+    for status in ("done", "ignored"):
+        ids = [row_id for row_id, s in statuses.items() if s == status]
+        if ids:
+            await db.execute(
+                update(InboundMessage)
+                .where(InboundMessage.id.in_(ids))
+                .values(status=status, processed_at=now, error=None)
+                .execution_options(synchronize_session=False)
+            )
+    await db.commit()
+    return replies
+
+
+async def send_replies(replies):
+    for phone, body in replies:
+        try:
+            await send_whatsapp_message(phone, body)
+        except Exception:
+            logger.exception("Inbound webhook reply failed")
+
+
+async def release_batch(db, rows, error: Exception):
+    # Puts failed rows back in the queue, or parks rows that keep failing.
+    await db.rollback()
+    for row in rows:
+        failed = row.attempts >= WEBHOOK_MAX_ATTEMPTS
+        await db.execute(
+            update(InboundMessage)
+            .where(InboundMessage.id == row.id)
+            .values(
+                status="failed" if failed else "pending",
+                error=repr(error),
+                processed_at=utcnow() if failed else None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+
+
+async def process_rows_individually(db, rows) -> list:
+    # After a batch fails, isolates the bad rows: healthy messages go through
+    # on their own and only the rows that fail again are released or parked.
+    replies = []
+    for row in rows:
+        try:
+            replies += await process_batch(db, [row])
+        except Exception as e:
+            logger.exception(f"Inbound webhook message {row.id} failed")
+            await release_batch(db, [row], e)
+    return replies
+
+
+async def drain_once(limit: int = WEBHOOK_BATCH_SIZE, ids=None) -> int:
+    db = new_async_session()
+    try:
+        rows = await claim_batch(db, limit, ids)
+        if not rows:
+            return 0
+        replies = []
+        try:
+            replies = await process_batch(db, rows)
+        except Exception as e:
+            if len(rows) == 1:
+                logger.exception("Inbound webhook message failed")
+                await release_batch(db, rows, e)
+            else:
+                logger.exception("Inbound webhook batch failed; retrying messages one at a time")
+                await db.rollback()
+                replies = await process_rows_individually(db, rows)
+        # Sent only after every row is settled, so a failed send can't
+        # reprocess committed messages.
+        await send_replies(replies)
+        return len(rows)
+    finally:
+        await db.close()
+
+
+async def _worker():
+    while True:
+        # Cleared before draining so a webhook arriving mid-batch still
+        # triggers another pass.
+        _wake.clear()
+        try:
+            processed = await drain_once()
+        except Exception:
+            logger.exception("Inbound webhook worker error")
+            processed = 0
+
+        if processed:
+            continue
+
+        # The timeout picks up rows queued by other processes and batches
+        # that were released for retry.
+        try:
+            await asyncio.wait_for(_wake.wait(), WEBHOOK_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def start_inbound_worker():
+    global _worker_task
+    if _worker_task is None:
+        _worker_task = asyncio.create_task(_worker())
+
+
+async def stop_inbound_worker():
+    global _worker_task
+    if _worker_task is None:
+        return
+    _worker_task.cancel()
+    await asyncio.gather(_worker_task, return_exceptions=True)
+    _worker_task = None
@@ -0,0 +1,115 @@
+from sqlalchemy import event, inspect, select, tuple_, update
+from sqlalchemy.orm import Session, joinedload
+
+from app.models import Conversation, Message, utcnow
+from app.services.page_cache import touch
+from app.utils.pagination import encode_cursor, decode_cursor
+
+PREVIEW_LENGTH = 120
+INBOX_PAGE_SIZE = 50
+MAX_INBOX_PAGE_SIZE = 200
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+
+
+def list_open_conversations(db: Session, cursor: str = None, limit: int = INBOX_PAGE_SIZE):
+    # One query per page: keyset over (last_message_at, id) on the partial
+    # open-conversation index, with the contact joined in.
+    limit = max(1, min(limit, MAX_INBOX_PAGE_SIZE))
+
+    query = (
+        select(Conversation)
+        .options(joinedload(Conversation.contact))
+        .where(Conversation.status == "open")
+        .order_by(Conversation.last_message_at.desc(), Conversation.id.desc())
+        .limit(limit + 1)
+    )
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        query = query.where(
+            tuple_(Conversation.last_message_at, Conversation.id) < tuple_(*position)
+        )
+
+    conversations = db.scalars(query).all()
+
+    next_cursor = None
+    if len(conversations) > limit:
+        conversations = conversations[:limit]
+        last = conversations[-1]
+        next_cursor = encode_cursor(last.last_message_at, last.id)
+
+    return conversations, next_cursor
+
+
+def message_window(db: Session, conversation_id: int, before: str = None, limit: int = MESSAGE_PAGE_SIZE):
+    # Latest `limit` messages (or those older than the `before` cursor),
+    # returned oldest-first for rendering, plus the cursor for the next
+    # older page.
+    limit = max(1, min(limit, MAX_MESSAGE_PAGE_SIZE))
+
+    query = (
+        select(Message)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.timestamp.desc(), Message.id.desc())
+        .limit(limit + 1)
+    )
+
+    position = decode_cursor(before) if before else None
+    if position:
+        query = query.where(tuple_(Message.timestamp, Message.id) < tuple_(*position))
+
+    messages = db.scalars(query).all()
+
+    older_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        oldest = messages[-1]
+        older_cursor = encode_cursor(oldest.timestamp, oldest.id)
+
+    messages.reverse()
+    return messages, older_cursor
+
+
+def mark_conversation_read(db: Session, conversation_id: int):
+    result = db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id, Conversation.unread_count != 0)
+        .values(unread_count=0)
+    )
+    if result.rowcount:
+        touch(db, "conversations")
+    db.commit()
+
+
+def activity_values(sender: str, body: str, timestamp=None, unread: int = 1) -> dict:
+    # Client messages count as unread; a staff reply means the thread has
+    # been read.
+    return {
+        "last_message_at": timestamp or utcnow(),
+        "last_message_preview": body[:PREVIEW_LENGTH],
+        "unread_count": Conversation.unread_count + unread if sender == "client" else 0,
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _track_conversation_activity(session, flush_context):
+    latest = {}
+    unread = {}
+    for obj in session.new:
+        if isinstance(obj, Message):
+            latest[obj.conversation_id] = obj
+            if obj.sender == "client":
+                unread[obj.conversation_id] = unread.get(obj.conversation_id, 0) + 1
+
+    for conversation_id, message in latest.items():
+        # Read the timestamp from the instance dict: server defaults are
+        # expired after insert and touching them here would emit a SELECT.
+        timestamp = inspect(message).dict.get("timestamp")
+        session.connection().execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(**activity_values(
+                message.sender, message.body, timestamp, unread.get(conversation_id, 0)
+            ))
+        )
@@ -0,0 +1,68 @@
+from collections import Counter
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import upsert_insert
+from app.models import Contact, Conversation
+from app.services.contact_cache import contact_cache, remember
+from app.services.dashboard_metrics import apply_counter_deltas
+from app.services.page_cache import touch
+from app.utils.phone import normalize_phone
+
+def _record_intake(session, deltas: Counter):
+    apply_counter_deltas(session.connection(), deltas)
+    if +deltas:
+        touch(session, "contacts", "conversations")
+
+
+@dataclass(frozen=True)
+class Intake:
+    contact_id: int
+    conversation_id: int
+    phone: str
+
+
+async def _insert_or_get(db: AsyncSession, model, key: str, values: dict):
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING id only returns a row when
+    # this statement created it; otherwise the existing row is selected.
+    # Concurrent submissions for the same phone can't both insert.
+    inserted_id = await db.scalar(
+        upsert_insert(db.sync_session, model)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[key])
+        .returning(model.id)
+    )
+    if inserted_id is not None:
+        return inserted_id, True
+
+    existing_id = await db.scalar(
+        select(model.id).where(getattr(model, key) == values[key])
+    )
+    return existing_id, False
+
+
+async def open_intake(db: AsyncSession, name: str, phone: str) -> Intake:
+    # Upserts the contact and its conversation without committing; the
+    # caller adds the ticket/booking/message rows and commits once.
+    phone = normalize_phone(phone)
+
+    cached = contact_cache.get(phone)
+    if cached:
+        contact_id, conversation_id = cached
+        return Intake(contact_id=contact_id, conversation_id=conversation_id, phone=phone)
+
+    contact_id, new_contact = await _insert_or_get(
+        db, Contact, "phone", {"name": name, "phone": phone}
+    )
+    conversation_id, new_conversation = await _insert_or_get(
+        db, Conversation, "contact_id", {"contact_id": contact_id}
+    )
+
+    # Core inserts skip the ORM flush hooks that maintain dashboard counters.
+    deltas = Counter(total_leads=int(new_contact), active_conversations=int(new_conversation))
+    await db.run_sync(_record_intake, deltas)
+    remember(db.sync_session, phone, contact_id, conversation_id)
+
+    return Intake(contact_id=contact_id, conversation_id=conversation_id, phone=phone)
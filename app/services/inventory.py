@@ -0,0 +1,163 @@
+from collections import Counter
+from dataclasses import dataclass
+from datetime import timedelta
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Inventory, InventoryMovement, utcnow
+from app.services.dashboard_metrics import apply_counter_deltas
+from app.services.page_cache import touch
+from app.services.realtime import emit, inventory_event, stock_item
+
+
+@dataclass(frozen=True)
+class StockLevel:
+    id: int
+    name: str
+    quantity: int
+    threshold: int
+    delta: int
+
+    @property
+    def low(self) -> bool:
+        return self.quantity <= self.threshold
+
+    @property
+    def was_low(self) -> bool:
+        return self.quantity - self.delta <= self.threshold
+
+
+def combine_adjustments(item_ids, deltas):
+    # Pairs up repeated item_id/delta form fields, summing repeats of an item.
+    # Returns None when the lists don't line up.
+    if len(item_ids) != len(deltas):
+        return None
+    combined = {}
+    for item_id, delta in zip(item_ids, deltas):
+        combined[item_id] = combined.get(item_id, 0) + delta
+    return combined
+
+
+def adjust_inventory(db: Session, deltas: dict, user_id: int = None, reason: str = "adjustment"):
+    # Applies {item_id: delta} in a single UPDATE ... SET quantity = quantity
+    # + CASE ... RETURNING, so concurrent adjustments add up instead of
+    # overwriting each other. Items that don't exist or would go below zero
+    # are left alone and reported in `rejected`. Does not commit.
+    deltas = {item_id: delta for item_id, delta in deltas.items() if delta}
+    if not deltas:
+        return [], []
+
+    delta_for = case(deltas, value=Inventory.id)
+    rows = db.execute(
+        update(Inventory)
+        .where(Inventory.id.in_(deltas), Inventory.quantity + delta_for >= 0)
+        .values(quantity=Inventory.quantity + delta_for)
+        .returning(Inventory.id, Inventory.name, Inventory.quantity, Inventory.threshold)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    levels = [
+        StockLevel(
+            id=row.id,
+            name=row.name,
+            quantity=row.quantity,
+            threshold=row.threshold,
+            delta=deltas[row.id],
+        )
+        for row in rows
+    ]
+    rejected = sorted(set(deltas) - {level.id for level in levels})
+
+    if levels:
+        db.execute(
+            InventoryMovement.__table__.insert(),
+            [
+                {
+                    "inventory_id": level.id,
+                    "delta": level.delta,
+                    "quantity_after": level.quantity,
+                    "reason": reason,
+                    "user_id": user_id,
+                    "created_at": utcnow(),
+                }
+                for level in levels
+            ],
+        )
+
+        # The Core UPDATE skips the ORM flush hooks that maintain counters
+        # and publish inventory events.
+        apply_counter_deltas(
+            db.connection(),
+            Counter(low_stock=sum(level.low - level.was_low for level in levels)),
+        )
+        emit(db, inventory_event([
+            stock_item(level.id, level.name, level.quantity, level.threshold, level.was_low)
+            for level in levels
+        ]))
+        touch(db, "inventory")
+
+    return levels, rejected
+
+
+def set_inventory_quantity(db: Session, item_id: int, quantity: int, user_id: int = None):
+    # Absolute stock count (e.g. after a stocktake). The row is locked while
+    # the difference is recorded, so the ledger still sums to the quantity.
+    # Does not commit.
+    item = db.scalar(select(Inventory).where(Inventory.id == item_id).with_for_update())
+    if not item:
+        return None
+
+    delta = quantity - item.quantity
+    item.quantity = quantity
+    if delta:
+        db.add(
+            InventoryMovement(
+                inventory_id=item.id,
+                delta=delta,
+                quantity_after=quantity,
+                reason="count",
+                user_id=user_id,
+            )
+        )
+    return item
+
+
+def record_initial_stock(db: Session, item: Inventory, user_id: int = None):
+    if not item.quantity:
+        return
+    db.flush()
+    db.add(
+        InventoryMovement(
+            inventory_id=item.id,
+            delta=item.quantity,
+            quantity_after=item.quantity,
+            reason="initial",
+            user_id=user_id,
+        )
+    )
+
+
+def stock_history(db: Session, item_id: int, limit: int = 100):
+    return db.scalars(
+        select(InventoryMovement)
+        .where(InventoryMovement.inventory_id == item_id)
+        .order_by(InventoryMovement.created_at.desc(), InventoryMovement.id.desc())
+        .limit(limit)
+    ).all()
+
+
+def consumption_rates(db: Session, days: int = 30) -> dict:
+    # Average units consumed per day over the window, per item, from the
+    # ledger alone. Stock counts are corrections, not consumption.
+    since = utcnow() - timedelta(days=days)
+    rows = db.execute(
+        select(InventoryMovement.inventory_id, (-func.sum(InventoryMovement.delta)).label("used"))
+        .where(
+            InventoryMovement.created_at >= since,
+            InventoryMovement.delta < 0,
+            InventoryMovement.reason == "adjustment",
+        )
+        .group_by(InventoryMovement.inventory_id)
+    ).all()
+    return {item_id: used / days for item_id, used in rows}
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy import event
+
+from app.config import EVENT_LOOP_LAG_INTERVAL
+from app.database import named_engines
+from app.services.contact_cache import contact_cache
+from app.services.page_cache import page_cache
+from app.services.stock_alerts import low_stock
+from app.services.telemetry import (
+    METRICS,
+    RequestStats,
+    db_connection_acquire_seconds,
+    db_connections_opened,
+    db_seconds_per_request,
+    db_statement_seconds,
+    db_statements_per_request,
+    event_loop_lag_seconds,
+    http_request_seconds,
+    request_stats,
+)
+from app.services.whatsapp_service import queued_messages
+from app.utils.security import password_pool_stats
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# =========================
+# REQUESTS
+# =========================
+
+class MetricsMiddleware:
+    # Plain ASGI rather than @app.middleware, which would add a task and a
+    # response copy to every request.
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths = None
+
+    def _route(self, scope) -> str:
+        # Label by route template (/staff/conversation/{conversation_id}),
+        # not the raw path, to keep the series count bounded.
+        if self._route_paths is None:
+            self._route_paths = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self._route_paths.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            request_stats.reset(token)
+            route = self._route(scope)
+            http_request_seconds.observe(elapsed, scope["method"], route, str(status))
+            db_statements_per_request.observe(stats.statements, route)
+            db_seconds_per_request.observe(stats.db_seconds, route)
+
+
+# =========================
+# DATABASE INSTRUMENTATION
+# =========================
+
+def instrument_engine(name: str, sync_engine):
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_metrics_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        db_statement_seconds.observe(elapsed, name)
+        stats = request_stats.get()
+        if stats is not None:
+            stats.add_statement(elapsed)
+
+    @event.listens_for(sync_engine, "connect")
+    def _opened(dbapi_connection, connection_record):
+        db_connections_opened.inc(name)
+
+    # Pools have no event for "started waiting", so time the public
+    # pool.connect() call. dispose() swaps in a new pool, which is wrapped
+    # again.
+    def time_acquire(pool):
+        connect = pool.connect
+
+        def timed_connect():
+            start = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                db_connection_acquire_seconds.observe(time.perf_counter() - start, name)
+
+        pool.connect = timed_connect
+
+    event.listen(sync_engine, "engine_disposed", lambda engine: time_acquire(engine.pool))
+    time_acquire(sync_engine.pool)
+
+
+def instrument_engines():
+    for name, sync_engine in named_engines().items():
+        instrument_engine(name, sync_engine)
+
+
+# =========================
+# EVENT LOOP LAG
+# =========================
+
+_lag_task = None
+_last_lag = 0.0
+
+
+async def _measure_loop_lag():
+    global _last_lag
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + EVENT_LOOP_LAG_INTERVAL
+        await asyncio.sleep(EVENT_LOOP_LAG_INTERVAL)
+        _last_lag = max(0.0, loop.time() - expected)
+        event_loop_lag_seconds.observe(_last_lag)
+
+
+async def start_loop_monitor():
+    global _lag_task
+    if _lag_task is None:
+        _lag_task = asyncio.create_task(_measure_loop_lag())
+
+
+async def stop_loop_monitor():
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        await asyncio.gather(_lag_task, return_exceptions=True)
+        _lag_task = None
+
+
+# =========================
+# EXPOSITION
+# =========================
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _render_metric(metric) -> list:
+    lines = [f"# HELP {metric.name} {metric.description}", f"# TYPE {metric.name} {metric.type}"]
+    for label_values, sample in sorted(metric.series().items()):
+        if metric.type == "counter":
+            lines.append(f"{metric.name}{_labels(metric.labels, label_values)} {_number(sample)}")
+            continue
+        cumulative, total, count = sample
+        for bound, value in zip(metric.buckets + (float("inf"),), cumulative + [count]):
+            labels = _labels(metric.labels, label_values, [("le", _number(bound))])
+            lines.append(f"{metric.name}_bucket{labels} {value}")
+        labels = _labels(metric.labels, label_values)
+        lines.append(f"{metric.name}_sum{labels} {_number(total)}")
+        lines.append(f"{metric.name}_count{labels} {count}")
+    return lines
+
+
+def _gauges():
+    # (name, description, [(labels, value)]) read at scrape time.
+    pools = []
+    for name, sync_engine in named_engines().items():
+        pool = sync_engine.pool
+        for stat in ("size", "checkedout", "overflow", "checkedin"):
+            if hasattr(pool, stat):
+                pools.append(((("engine", name), ("stat", stat)), getattr(pool, stat)()))
+    yield "careops_db_pool_connections", "Connection pool state per engine.", pools
+
+    yield "careops_event_loop_lag_last_seconds", "Most recent event loop lag sample.", [((), _last_lag)]
+    yield "careops_whatsapp_queued_messages", "Outbound WhatsApp messages waiting to be sent.", [((), queued_messages())]
+    yield "careops_low_stock_items", "Inventory items at or below their threshold.", [((), low_stock.count())]
+
+    for prefix, description, stats in (
+        ("careops_contact_cache", "Phone to contact cache.", contact_cache.stats()),
+        ("careops_page_cache", "Rendered dashboard page cache.", page_cache.stats()),
+        ("careops_password_pool", "Password hashing pool.", password_pool_stats()),
+    ):
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"{prefix}_{key}", description, [((), value)]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(_render_metric(metric))
+    for name, description, samples in _gauges():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            lines.append(f"{name}{_labels([k for k, _ in labels], [v for _, v in labels])} {_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,40 @@
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal
+from app.models import User
+
+
+# Process-wide flag. It only ever flips from False to True: once an owner
+# exists the workspace is onboarded for good, so no locking is needed.
+_onboarded = False
+
+
+def is_onboarded() -> bool:
+    return _onboarded
+
+
+def mark_onboarded():
+    global _onboarded
+    _onboarded = True
+
+
+def _owner_exists() -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(User.id).filter(User.role == "owner").first() is not None
+    finally:
+        db.close()
+
+
+def refresh_onboarding_state() -> bool:
+    # Another worker may have completed onboarding, so until this process
+    # has seen an owner it keeps asking the database.
+    if not _onboarded and _owner_exists():
+        mark_onboarded()
+    return _onboarded
+
+
+async def ensure_onboarded() -> bool:
+    if _onboarded:
+        return True
+    return await run_in_threadpool(refresh_onboarding_state)
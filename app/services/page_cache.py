@@ -0,0 +1,231 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.config import PAGE_CACHE_SIZE, PAGE_CACHE_TTL, REALTIME_BACKEND
+from app.database import RoutingSession
+from app.models import Booking, Contact, Conversation, Inventory, Message, User
+from app.services.realtime import broker, emit
+
+# Data versions are per process and only hear about other workers' commits
+# through LISTEN/NOTIFY. With the in-process backend a worker could answer
+# 304 for data another worker changed, indefinitely, so nothing is cached.
+ENABLED = REALTIME_BACKEND == "postgres"
+
+# Which data each cached view is built from.
+OWNER_DASHBOARD = ("contacts", "conversations", "bookings", "inventory")
+OWNER_INVENTORY = ("inventory",)
+OWNER_STAFF = ("users",)
+STAFF_DASHBOARD = ("conversations", "bookings", "inventory")
+STAFF_INBOX = ("conversations",)
+
+MODEL_TOPICS = {
+    Booking: "bookings",
+    Contact: "contacts",
+    Conversation: "conversations",
+    # A new message moves its conversation's preview and unread count.
+    Message: "conversations",
+    Inventory: "inventory",
+    User: "users",
+}
+
+EMITTED_KEY = "page_topics_emitted"
+COMMIT_KEY = "page_topics_pending"
+
+
+class DataVersions:
+    # Per-process counters, bumped whenever a topic's rows change in any
+    # worker (via realtime events). The epoch keeps counters from different
+    # processes or restarts from ever producing the same ETag.
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def bump(self, topics):
+        with self._lock:
+            for topic in topics:
+                self._versions[topic] = self._versions.get(topic, 0) + 1
+
+    def reset(self):
+        # New epoch: every ETag handed out so far stops matching.
+        with self._lock:
+            self.epoch = uuid.uuid4().hex
+
+    def snapshot(self, topics) -> tuple:
+        with self._lock:
+            return tuple(self._versions.get(topic, 0) for topic in topics)
+
+
+versions = DataVersions()
+
+
+class PageCache:
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, snapshot: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == snapshot and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2], entry[3]
+            self.misses += 1
+            return None
+
+    def put(self, key, snapshot: tuple, topics, body: bytes, media_type: str):
+        with self._lock:
+            self._entries[key] = (
+                snapshot,
+                time.monotonic() + self.ttl,
+                body,
+                media_type,
+                set(topics),
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, topics=None):
+        # Drops pages built from any of `topics`, or everything.
+        with self._lock:
+            if topics is None:
+                self._entries.clear()
+                return
+            stale = [key for key, entry in self._entries.items() if entry[4] & set(topics)]
+            for key in stale:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+page_cache = PageCache(PAGE_CACHE_TTL, PAGE_CACHE_SIZE)
+
+
+def data_changed(topics):
+    versions.bump(topics)
+    page_cache.invalidate(topics)
+
+
+def touch(session: Session, *topics):
+    # For writers that bypass the ORM (Core statements, upserts).
+    new = set(topics) - session.info.setdefault(EMITTED_KEY, set())
+    if new:
+        session.info[EMITTED_KEY] |= new
+        session.info.setdefault(COMMIT_KEY, set()).update(new)
+        emit(session, {"type": "data_changed", "topics": sorted(new)})
+
+
+# =========================
+# CONDITIONAL RESPONSES
+# =========================
+
+def page_etag(request: Request, user, snapshot: tuple) -> str:
+    key = "|".join([
+        versions.epoch,
+        request.url.path,
+        request.url.query,
+        str(user.id),
+        user.role,
+        ",".join(map(str, snapshot)),
+    ])
+    return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {value.strip() for value in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def cached_page(request: Request, user, db: Session, topics, render):
+    # Answers from the ETag or the page cache while the view's data versions
+    # haven't moved; only render() touches the database.
+    #
+    # Versions move when the primary commits. A replica that hasn't caught up
+    # yet would render old data under the new version, so replica reads are
+    # never cached or tagged.
+    if not ENABLED or isinstance(db, RoutingSession):
+        return render()
+
+    snapshot = versions.snapshot(topics)
+    etag = page_etag(request, user, snapshot)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (user.id, user.role, request.url.path, request.url.query)
+    if PAGE_CACHE_TTL > 0:
+        cached = page_cache.get(key, snapshot)
+        if cached:
+            body, media_type = cached
+            return Response(content=body, media_type=media_type, headers=headers)
+
+    response = render()
+    if response.status_code == 200:
+        response.headers.update(headers)
+        if PAGE_CACHE_TTL > 0:
+            page_cache.put(key, snapshot, topics, response.body, response.media_type)
+    return response
+
+
+# =========================
+# CHANGE TRACKING
+# =========================
+
+@event.listens_for(Session, "after_flush")
+def _collect_topics(session, flush_context):
+    changed = {
+        topic
+        for obj in list(session.new) + list(session.deleted) + list(session.dirty)
+        for model, topic in MODEL_TOPICS.items()
+        if isinstance(obj, model) and (obj not in session.dirty or session.is_modified(obj))
+    }
+    if changed:
+        touch(session, *changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed(session):
+    # Bump this process right away so a redirect straight back to the page
+    # can't revalidate against the old version; other workers catch up from
+    # the realtime event.
+    session.info.pop(EMITTED_KEY, None)
+    topics = session.info.pop(COMMIT_KEY, None)
+    if topics:
+        data_changed(topics)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_topics(session):
+    session.info.pop(EMITTED_KEY, None)
+    session.info.pop(COMMIT_KEY, None)
+
+
+def _on_event(payload: dict):
+    if payload.get("type") == "data_changed":
+        data_changed(payload["topics"])
+    elif payload.get("type") == "resync":
+        versions.reset()
+        page_cache.invalidate()
+
+
+broker.add_listener(_on_event)
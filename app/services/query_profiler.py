@@ -0,0 +1,179 @@
+import contextvars
+import logging
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+from app.config import QUERY_PROFILER_REPEAT_THRESHOLD, QUERY_PROFILER_SLOW_MS
+from app.database import named_engines
+
+logger = logging.getLogger(__name__)
+
+EXPLAINING_KEY = "query_profiler_explaining"
+
+_PLACEHOLDER = r"(?:\?|%\(\w+\)s|:\w+)"
+_IN_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+# asyncpg numbers its placeholders, so the numbers after an IN list shift
+# with its length.
+_NUMBERED = re.compile(r"\$\d+")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    # Same query with different values or IN-list lengths -> same shape.
+    shape = _NUMBERED.sub("?", statement)
+    shape = _LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("(...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class QueryRecord:
+    engine: str
+    shape: str
+    seconds: float
+    slow: bool
+
+
+@dataclass
+class RequestProfile:
+    method: str
+    path: str
+    queries: list = field(default_factory=list)
+
+    @property
+    def seconds(self) -> float:
+        return sum(query.seconds for query in self.queries)
+
+    @property
+    def slow(self) -> int:
+        return sum(query.slow for query in self.queries)
+
+    def repeated(self, threshold: int = QUERY_PROFILER_REPEAT_THRESHOLD) -> list:
+        # [(shape, count, seconds)] for shapes run `threshold`+ times, the
+        # usual sign of a per-row lazy load.
+        groups = defaultdict(lambda: [0, 0.0])
+        for query in self.queries:
+            groups[query.shape][0] += 1
+            groups[query.shape][1] += query.seconds
+        return sorted(
+            ((shape, count, seconds) for shape, (count, seconds) in groups.items() if count >= threshold),
+            key=lambda group: -group[1],
+        )
+
+    def summary(self) -> str:
+        return (
+            f"queries={len(self.queries)} db_ms={self.seconds * 1000:.1f} "
+            f"repeated={len(self.repeated())} slow={self.slow}"
+        )
+
+
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+
+# =========================
+# ENGINE HOOKS
+# =========================
+
+def _explain(conn, statement: str, parameters) -> str:
+    # Runs on the statement's own connection so it sees the same
+    # transaction. On Postgres a savepoint keeps a failed EXPLAIN from
+    # aborting the caller's transaction.
+    conn.info[EXPLAINING_KEY] = True
+    try:
+        if conn.dialect.name == "sqlite":
+            rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        else:
+            with conn.begin_nested():
+                rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).all()
+    except Exception as e:
+        return f"(EXPLAIN failed: {e})"
+    finally:
+        conn.info.pop(EXPLAINING_KEY, None)
+    return "\n".join(" ".join(str(column) for column in row) for row in rows)
+
+
+def profile_engine(name: str, sync_engine):
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profiler_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_profiler_start", None)
+        if start is None or conn.info.get(EXPLAINING_KEY):
+            return
+        elapsed = time.perf_counter() - start
+        slow = elapsed * 1000 >= QUERY_PROFILER_SLOW_MS
+
+        profile = current_profile.get()
+        if profile is not None:
+            profile.queries.append(QueryRecord(name, statement_shape(statement), elapsed, slow))
+
+        if slow:
+            where = f"{profile.method} {profile.path}" if profile else "background"
+            plan = ""
+            if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+                plan = "\n" + _explain(conn, statement, parameters)
+            logger.warning(
+                f"Slow query ({elapsed * 1000:.1f} ms, {name}) during {where}:\n{statement}{plan}"
+            )
+
+
+def install_query_profiler():
+    for name, sync_engine in named_engines().items():
+        profile_engine(name, sync_engine)
+
+
+# =========================
+# REQUESTS
+# =========================
+
+class QueryProfilerMiddleware:
+    # Adds an X-Query-Profile summary and a Server-Timing "db" entry (shown
+    # in browser dev tools) to every response, and logs repeated statement
+    # shapes. Statements run after the headers are sent (streamed bodies)
+    # only appear in the log.
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = current_profile.set(profile)
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-profile", profile.summary().encode()))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={profile.seconds * 1000:.1f};desc="{len(profile.queries)} queries"'.encode(),
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            current_profile.reset(token)
+            self._report(profile)
+
+    def _report(self, profile: RequestProfile):
+        repeated = profile.repeated()
+        if not repeated:
+            logger.debug(f"{profile.method} {profile.path}: {profile.summary()}")
+            return
+        lines = [f"Possible N+1 in {profile.method} {profile.path} ({profile.summary()}):"]
+        for shape, count, seconds in repeated:
+            lines.append(f"  {count}x ({seconds * 1000:.1f} ms) {shape}")
+        logger.warning("\n".join(lines))
@@ -0,0 +1,242 @@
+import asyncio
+import json
+import logging
+import uuid
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.config import DATABASE_URL, REALTIME_BACKEND
+from app.models import Booking, Inventory, Message, Ticket
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "careops_events"
+SUBSCRIBER_QUEUE_SIZE = 100
+# NOTIFY payloads must be shorter than 8000 bytes. Events are ASCII-only
+# JSON, where one character can take up to 12 bytes (a \uXXXX surrogate
+# pair), so message events carry a preview and clients fetch the rest.
+MAX_PAYLOAD_BYTES = 7999
+MAX_PREVIEW_LENGTH = 300
+# Tags events with the process that caused them, for consumers that should
+# react once per change rather than once per worker.
+PROCESS_ID = uuid.uuid4().hex
+
+
+class EventBroker:
+    def __init__(self):
+        self._loop = None
+        self._subscribers = set()
+        self._listeners = []
+
+    def bind_loop(self, loop):
+        self._loop = loop
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def add_listener(self, callback):
+        # In-process consumers; called on the event loop for every event.
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def dispatch(self, payload: dict):
+        # Must run on the event loop thread.
+        for queue in self._subscribers:
+            if queue.full():
+                # A stalled browser should lose old events, not block others.
+                queue.get_nowait()
+            queue.put_nowait(payload)
+        for callback in self._listeners:
+            try:
+                callback(payload)
+            except Exception as e:
+                logger.error(f"Realtime listener failed: {e}")
+
+    def publish(self, payload: dict):
+        # Safe to call from any thread, including threadpool routes.
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self.dispatch, payload)
+
+
+broker = EventBroker()
+
+
+def emit(session: Session, payload: dict):
+    # Queue an event for delivery once the session's transaction commits.
+    # With the postgres backend NOTIFY is itself transactional, so it is sent
+    # right away on the session's connection.
+    if REALTIME_BACKEND == "postgres":
+        data = json.dumps(payload, default=str)
+        if len(data.encode()) > MAX_PAYLOAD_BYTES:
+            logger.error(f"Dropping oversized realtime event {payload.get('type')}")
+            return
+        # A failed NOTIFY only costs the event; the savepoint keeps it from
+        # aborting the write that raised it.
+        connection = session.connection()
+        try:
+            with connection.begin_nested():
+                connection.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": CHANNEL, "payload": data},
+                )
+        except Exception as e:
+            logger.error(f"Realtime NOTIFY failed: {e}")
+    else:
+        session.info.setdefault("realtime_events", []).append(payload)
+
+
+def message_event(message: Message) -> dict:
+    timestamp = inspect(message).dict.get("timestamp")
+    return {
+        "type": "message",
+        "conversation_id": message.conversation_id,
+        "message": {
+            "id": message.id,
+            "sender": message.sender,
+            "body": message.body[:MAX_PREVIEW_LENGTH],
+            "truncated": len(message.body) > MAX_PREVIEW_LENGTH,
+            "timestamp": timestamp.isoformat() if timestamp else None,
+        },
+    }
+
+
+def ticket_event(ticket: Ticket) -> dict:
+    return {
+        "type": "ticket",
+        "conversation_id": ticket.conversation_id,
+        "ticket_number": ticket.ticket_number,
+        "form_type": ticket.form_type,
+    }
+
+
+def booking_confirmed_event(booking: Booking) -> dict:
+    return {
+        "type": "booking_confirmed",
+        "booking_id": booking.id,
+        "contact_id": booking.contact_id,
+    }
+
+
+def stock_item(id: int, name: str, quantity: int, threshold: int, was_low: bool) -> dict:
+    return {
+        "id": id,
+        "name": name,
+        "quantity": quantity,
+        "threshold": threshold,
+        "was_low": was_low,
+    }
+
+
+def inventory_event(items: list) -> dict:
+    return {"type": "inventory", "origin": PROCESS_ID, "items": items}
+
+
+def _stock_change(item: Inventory, new: bool):
+    state = inspect(item)
+    if new:
+        was_low = False
+    else:
+        quantity, threshold = (
+            state.attrs[key].history.deleted[0]
+            if state.attrs[key].history.deleted
+            else getattr(item, key)
+            for key in ("quantity", "threshold")
+        )
+        was_low = quantity <= threshold
+    return stock_item(item.id, item.name, item.quantity, item.threshold, was_low)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_events(session, flush_context):
+    stock = [_stock_change(obj, new=True) for obj in session.new if isinstance(obj, Inventory)]
+    stock += [
+        _stock_change(obj, new=False)
+        for obj in session.dirty
+        if isinstance(obj, Inventory) and session.is_modified(obj)
+    ]
+    if stock:
+        emit(session, inventory_event(stock))
+
+    for obj in session.new:
+        if isinstance(obj, Message):
+            emit(session, message_event(obj))
+        elif isinstance(obj, Ticket):
+            emit(session, ticket_event(obj))
+
+    for obj in session.dirty:
+        if isinstance(obj, Booking):
+            status = inspect(obj).attrs.status.history
+            if status.added and status.added[0] == "confirmed":
+                emit(session, booking_confirmed_event(obj))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_events(session):
+    for payload in session.info.pop("realtime_events", ()):
+        broker.publish(payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_events(session):
+    session.info.pop("realtime_events", None)
+
+
+# =========================
+# POSTGRES LISTEN/NOTIFY
+# =========================
+
+_listener_task = None
+
+
+async def _listen_postgres():
+    import asyncpg
+
+    dsn = make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+
+    def on_notify(connection, pid, channel, payload):
+        broker.dispatch(json.loads(payload))
+
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(dsn)
+            await connection.add_listener(CHANNEL, on_notify)
+            # Anything published while we weren't listening was missed.
+            broker.dispatch({"type": "resync"})
+            while not connection.is_closed():
+                await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Realtime LISTEN connection failed: {e}")
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(2)
+
+
+async def start_realtime():
+    global _listener_task
+    broker.bind_loop(asyncio.get_running_loop())
+    if REALTIME_BACKEND == "postgres" and _listener_task is None:
+        _listener_task = asyncio.create_task(_listen_postgres())
+
+
+async def stop_realtime():
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        await asyncio.gather(_listener_task, return_exceptions=True)
+        _listener_task = None
+    broker.bind_loop(None)
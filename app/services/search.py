@@ -0,0 +1,309 @@
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from markupsafe import Markup, escape
+from sqlalchemy import column, func, literal_column, select, table, union_all
+from sqlalchemy.orm import Session
+
+from app.config import SEARCH_MAX_CANDIDATES, SEARCH_PAGE_SIZE, SEARCH_RECENT_WINDOW
+from app.models import Contact, Conversation, Message, Ticket
+from app.utils.phone import normalize_phone
+
+MAX_TERMS = 8
+CONTACT_LIMIT = 10
+MIN_PHONE_DIGITS = 3
+
+_PHONE_QUERY = re.compile(r"[\d\s\-.()+/]+")
+
+# Postgres searches GIN expression indexes (migration 0005). The query
+# expressions must stay identical to the indexed ones or the planner falls
+# back to a sequential scan.
+MESSAGE_DOCUMENT = "to_tsvector('english', body)"
+CONTACT_DOCUMENT = "to_tsvector('simple', coalesce(name, '') || ' ' || replace(phone, '+', ''))"
+
+# SQLite uses FTS5 tables kept in sync by triggers (same migration).
+messages_fts = table("messages_fts", column("rowid"))
+contacts_fts = table("contacts_fts", column("rowid"))
+
+# Partial phone numbers use a trigram index (migration 0006): pg_trgm on
+# Postgres, an FTS5 trigram table on SQLite.
+contact_phones_fts = table("contact_phones_fts", column("rowid"))
+
+# Match markers in snippets. Private-use characters can't collide with
+# message text, so the snippet can be escaped before they become <mark>.
+MARK_START = "\ue000"
+MARK_END = "\ue001"
+HEADLINE_OPTIONS = f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=24, MinWords=10, MaxFragments=2"
+
+
+@dataclass(frozen=True)
+class MessageHit:
+    id: int
+    conversation_id: int
+    contact_name: str
+    sender: str
+    timestamp: datetime
+    snippet: Markup
+
+
+@dataclass(frozen=True)
+class ContactHit:
+    id: int
+    name: str
+    phone: str
+    conversation_id: int
+
+
+@dataclass(frozen=True)
+class TicketHit:
+    id: int
+    ticket_number: str
+    form_type: str
+    status: str
+    conversation_id: int
+    contact_name: str
+
+
+@dataclass
+class SearchResults:
+    query: str
+    page: int
+    messages: list = field(default_factory=list)
+    contacts: list = field(default_factory=list)
+    tickets: list = field(default_factory=list)
+    has_next: bool = False
+    # Only the most recent SEARCH_MAX_CANDIDATES matches were ranked.
+    truncated: bool = False
+
+
+def search_terms(query: str) -> list:
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def highlight(snippet: str) -> Markup:
+    text = str(escape(snippet or ""))
+    return Markup(text.replace(MARK_START, "<mark>").replace(MARK_END, "</mark>"))
+
+
+def _tsquery(terms) -> str:
+    # All terms must match; the last one is a prefix so results show up
+    # while a word is still being typed.
+    return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+
+def _fts5_query(terms) -> str:
+    return " ".join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+
+
+def phone_digits(query: str) -> str:
+    # "555", "(555) 12" -> the digits to look for inside stored numbers.
+    if not _PHONE_QUERY.fullmatch(query):
+        return ""
+    digits = re.sub(r"\D", "", query)
+    return digits if len(digits) >= MIN_PHONE_DIGITS else ""
+
+
+# =========================
+# MESSAGES
+# =========================
+
+def _message_hit(row) -> MessageHit:
+    return MessageHit(
+        id=row.id,
+        conversation_id=row.conversation_id,
+        contact_name=row.name,
+        sender=row.sender,
+        timestamp=row.timestamp,
+        snippet=highlight(row.snippet),
+    )
+
+
+def _search_messages_postgres(db: Session, terms, offset: int, limit: int):
+    query = func.to_tsquery(literal_column("'english'"), _tsquery(terms))
+    document = literal_column(MESSAGE_DOCUMENT)
+
+    # Rank a bounded set of matches (the most recent ones), then build
+    # headlines only for the page. Finding them is bounded too: a common
+    # term fills the cap from the recent window, walking it newest first
+    # instead of reading its whole GIN posting list, and the older part of
+    # the UNION ALL is then never run. Rarer terms fall through to the
+    # index over older messages.
+    recent_start = func.coalesce(
+        select(Message.id).order_by(Message.id.desc()).offset(SEARCH_RECENT_WINDOW).limit(1).scalar_subquery(),
+        0,
+    )
+
+    def matches(window):
+        return (
+            select(Message.id)
+            .where(window, document.bool_op("@@")(query))
+            .order_by(Message.id.desc())
+            .limit(SEARCH_MAX_CANDIDATES)
+            .subquery()
+        )
+
+    recent = matches(Message.id > recent_start)
+    older = matches(Message.id <= recent_start)
+    matched = union_all(select(recent.c.id), select(older.c.id)).subquery()
+    bounded = select(matched.c.id).limit(SEARCH_MAX_CANDIDATES).subquery()
+    candidates = (
+        select(Message.id, func.ts_rank_cd(document, query).label("rank"))
+        .join_from(bounded, Message, Message.id == bounded.c.id)
+        .subquery()
+    )
+    page = (
+        select(candidates, func.count().over().label("matched"))
+        .order_by(candidates.c.rank.desc(), candidates.c.id.desc())
+        .offset(offset)
+        .limit(limit)
+        .subquery()
+    )
+    return db.execute(
+        select(
+            Message.id,
+            Message.conversation_id,
+            Message.sender,
+            Message.timestamp,
+            Contact.name,
+            page.c.matched,
+            func.ts_headline(
+                literal_column("'english'"), Message.body, query, HEADLINE_OPTIONS
+            ).label("snippet"),
+        )
+        .join_from(page, Message, Message.id == page.c.id)
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .join(Contact, Contact.id == Conversation.contact_id)
+        .order_by(page.c.rank.desc(), page.c.id.desc())
+    ).all()
+
+
+def _search_messages_sqlite(db: Session, terms, offset: int, limit: int):
+    return db.execute(
+        select(
+            Message.id,
+            Message.conversation_id,
+            Message.sender,
+            Message.timestamp,
+            Contact.name,
+            func.snippet(literal_column("messages_fts"), 0, MARK_START, MARK_END, "…", 16).label("snippet"),
+        )
+        .select_from(messages_fts)
+        .join(Message, Message.id == messages_fts.c.rowid)
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .join(Contact, Contact.id == Conversation.contact_id)
+        .where(literal_column("messages_fts").op("MATCH")(_fts5_query(terms)))
+        # FTS5's rank is bm25, where lower is better.
+        .order_by(literal_column("messages_fts.rank"), Message.id.desc())
+        .offset(offset)
+        .limit(limit)
+    ).all()
+
+
+def search_messages(db: Session, terms, page: int = 1, page_size: int = SEARCH_PAGE_SIZE):
+    # Returns (hits, has_next, truncated). Fetches one extra row to know if
+    # there is another page without counting every match.
+    if not terms:
+        return [], False, False
+    offset = (page - 1) * page_size
+    truncated = False
+    if db.get_bind().dialect.name == "postgresql":
+        rows = _search_messages_postgres(db, terms, offset, page_size + 1)
+        truncated = bool(rows) and rows[0].matched >= SEARCH_MAX_CANDIDATES
+    else:
+        rows = _search_messages_sqlite(db, terms, offset, page_size + 1)
+    return [_message_hit(row) for row in rows[:page_size]], len(rows) > page_size, truncated
+
+
+# =========================
+# CONTACTS AND TICKETS
+# =========================
+
+def search_contacts(db: Session, query: str, terms, limit: int = CONTACT_LIMIT):
+    stmt = select(Contact.id, Contact.name, Contact.phone, Conversation.id.label("conversation_id")).outerjoin(
+        Conversation, Conversation.contact_id == Contact.id
+    )
+    hits = []
+
+    # A full number in any format resolves to one contact through the
+    # unique phone index.
+    phone = normalize_phone(query)
+    if phone:
+        hits.extend(db.execute(stmt.where(Contact.phone == phone)).all())
+
+    # Partial numbers ("555") aren't words the full-text indexes can match.
+    # Stored numbers are digits after the "+", so they're found as
+    # substrings through the trigram index; MIN_PHONE_DIGITS keeps every
+    # query at least one trigram long.
+    digits = phone_digits(query)
+    if digits:
+        if db.get_bind().dialect.name == "postgresql":
+            partial = stmt.where(Contact.phone.like(f"%{digits}%"))
+        else:
+            partial = stmt.join(contact_phones_fts, contact_phones_fts.c.rowid == Contact.id).where(
+                literal_column("contact_phones_fts").op("MATCH")(f'"{digits}"')
+            )
+        hits.extend(db.execute(partial.order_by(Contact.id.desc()).limit(limit)).all())
+
+    if terms:
+        if db.get_bind().dialect.name == "postgresql":
+            tsquery = func.to_tsquery(literal_column("'simple'"), _tsquery(terms))
+            document = literal_column(CONTACT_DOCUMENT)
+            matched = stmt.where(document.bool_op("@@")(tsquery)).order_by(
+                func.ts_rank_cd(document, tsquery).desc(), Contact.id.desc()
+            )
+        else:
+            matched = (
+                stmt.join(contacts_fts, contacts_fts.c.rowid == Contact.id)
+                .where(literal_column("contacts_fts").op("MATCH")(_fts5_query(terms)))
+                .order_by(literal_column("contacts_fts.rank"), Contact.id.desc())
+            )
+        hits.extend(db.execute(matched.limit(limit)).all())
+
+    seen = set()
+    unique = []
+    for row in hits:
+        if row.id not in seen:
+            seen.add(row.id)
+            unique.append(ContactHit(row.id, row.name, row.phone, row.conversation_id))
+    return unique[:limit]
+
+
+def find_tickets(db: Session, query: str):
+    # Ticket numbers are looked up exactly through their unique index.
+    number = query.strip().upper()
+    if not number:
+        return []
+    rows = db.execute(
+        select(
+            Ticket.id,
+            Ticket.ticket_number,
+            Ticket.form_type,
+            Ticket.status,
+            Ticket.conversation_id,
+            Contact.name,
+        )
+        .outerjoin(Contact, Contact.id == Ticket.contact_id)
+        .where(Ticket.ticket_number == number)
+    ).all()
+    return [
+        TicketHit(row.id, row.ticket_number, row.form_type, row.status, row.conversation_id, row.name)
+        for row in rows
+    ]
+
+
+def search(db: Session, query: str, page: int = 1) -> SearchResults:
+    query = (query or "").strip()
+    page = max(page, 1)
+    results = SearchResults(query=query, page=page)
+    if not query:
+        return results
+
+    terms = search_terms(query)
+    results.messages, results.has_next, results.truncated = search_messages(db, terms, page)
+    # Contacts and tickets are short exact-ish lists shown above the first
+    # page of messages.
+    if page == 1:
+        results.tickets = find_tickets(db, query)
+        results.contacts = search_contacts(db, query, terms)
+    return results
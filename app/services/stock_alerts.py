@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import LOW_STOCK_ALERT_DELAY, LOW_STOCK_RESYNC_INTERVAL, OWNER_WHATSAPP_NUMBER, REALTIME_BACKEND
+from app.database import SessionLocal
+from app.models import Inventory
+from app.services.realtime import PROCESS_ID, broker, stock_item
+from app.services.whatsapp_service import send_whatsapp_message
+
+logger = logging.getLogger(__name__)
+
+
+class LowStockSet:
+    # Items currently at or below their threshold, kept current from
+    # inventory events so dashboards don't have to query for it.
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def replace(self, items):
+        with self._lock:
+            self._items = {item["id"]: item for item in items}
+            self.loaded = True
+
+    def apply(self, item: dict):
+        with self._lock:
+            if item["quantity"] <= item["threshold"]:
+                self._items[item["id"]] = item
+            else:
+                self._items.pop(item["id"], None)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._items
+
+    def get(self, item_id: int):
+        return self._items.get(item_id)
+
+    def count(self) -> int:
+        return len(self._items)
+
+    def items(self) -> list:
+        with self._lock:
+            return sorted(self._items.values(), key=lambda item: item["name"])
+
+
+low_stock = LowStockSet()
+
+
+def query_low_stock(db: Session) -> list:
+    rows = db.execute(
+        select(Inventory.id, Inventory.name, Inventory.quantity, Inventory.threshold)
+        .where(Inventory.quantity <= Inventory.threshold)
+        .order_by(Inventory.name)
+    ).all()
+    return [stock_item(*row, was_low=True) for row in rows]
+
+
+def load_low_stock():
+    db = SessionLocal()
+    try:
+        low_stock.replace(query_low_stock(db))
+    finally:
+        db.close()
+
+
+def current_low_stock(db: Session) -> list:
+    # The set only hears about other workers' changes through the postgres
+    # backend; with the memory backend it can be stale, so ask the database.
+    if REALTIME_BACKEND == "postgres" and low_stock.loaded:
+        return low_stock.items()
+    return query_low_stock(db)
+
+
+# =========================
+# OWNER DIGEST
+# =========================
+
+_pending = set()
+_digest_timer = None
+# Keeps running sends referenced so they can't be garbage-collected.
+_digest_tasks = set()
+
+
+def digest_message(items) -> str:
+    lines = [f"- {item['name']}: {item['quantity']} left (threshold {item['threshold']})" for item in items]
+    return "Low stock alert:\n" + "\n".join(lines)
+
+
+def _take_digest():
+    global _digest_timer
+    _digest_timer = None
+
+    # Reports current levels; anything restocked during the delay drops out.
+    items = sorted(
+        filter(None, (low_stock.get(item_id) for item_id in _pending)),
+        key=lambda item: item["name"],
+    )
+    _pending.clear()
+    return digest_message(items) if items else None
+
+
+async def _deliver_digest(message: str):
+    try:
+        await send_whatsapp_message(OWNER_WHATSAPP_NUMBER, message)
+    except Exception:
+        logger.exception("Low-stock digest failed")
+
+
+def _send_digest():
+    message = _take_digest()
+    if message:
+        task = asyncio.create_task(_deliver_digest(message))
+        _digest_tasks.add(task)
+        task.add_done_callback(_digest_tasks.discard)
+
+
+def _on_event(payload: dict):
+    global _digest_timer
+    if payload.get("type") != "inventory":
+        return
+
+    for item in payload["items"]:
+        low_stock.apply(item)
+
+        # Every worker tracks the set; only the one that made the change
+        # alerts, and only when the item crossed its threshold.
+        newly_low = item["quantity"] <= item["threshold"] and not item["was_low"]
+        if newly_low and payload.get("origin") == PROCESS_ID and OWNER_WHATSAPP_NUMBER:
+            _pending.add(item["id"])
+
+    if _pending and _digest_timer is None:
+        _digest_timer = asyncio.get_running_loop().call_later(LOW_STOCK_ALERT_DELAY, _send_digest)
+
+
+_resync_task = None
+
+
+async def _resync():
+    # Safety net for events this worker never saw (e.g. the memory realtime
+    # backend with several workers).
+    while True:
+        await asyncio.sleep(LOW_STOCK_RESYNC_INTERVAL)
+        try:
+            await run_in_threadpool(load_low_stock)
+        except Exception as e:
+            logger.error(f"Low-stock resync failed: {e}")
+
+
+async def start_stock_alerts():
+    global _resync_task
+    if _resync_task is not None:
+        return
+    broker.add_listener(_on_event)
+    await run_in_threadpool(load_low_stock)
+    _resync_task = asyncio.create_task(_resync())
+
+
+async def stop_stock_alerts():
+    global _resync_task, _digest_timer
+    if _resync_task is None:
+        return
+    _resync_task.cancel()
+    await asyncio.gather(_resync_task, return_exceptions=True)
+    _resync_task = None
+    broker.remove_listener(_on_event)
+
+    if _digest_timer is not None:
+        # Send what's pending rather than dropping it on shutdown.
+        _digest_timer.cancel()
+        message = _take_digest()
+        if message:
+            await _deliver_digest(message)
+    await asyncio.gather(*_digest_tasks, return_exceptions=True)
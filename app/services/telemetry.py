@@ -0,0 +1,147 @@
+import bisect
+import contextvars
+import threading
+from dataclasses import dataclass, field
+
+# Seconds; suits template renders and SQL statements as well as requests.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    # Cumulative-bucket histogram keyed by label values, shaped like a
+    # Prometheus histogram so it can be exported as one.
+    type = "histogram"
+
+    def __init__(self, name: str, description: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def series(self) -> dict:
+        # {label_values: (cumulative bucket counts, sum, count)}
+        with self._lock:
+            result = {}
+            for label_values, (counts, total, count) in self._series.items():
+                cumulative, running = [], 0
+                for bucket_count in counts:
+                    running += bucket_count
+                    cumulative.append(running)
+                result[label_values] = (cumulative, total, count)
+            return result
+
+
+class CounterMetric:
+    type = "counter"
+
+    def __init__(self, name: str, description: str, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def series(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add_statement(self, seconds: float):
+        with self._lock:
+            self.statements += 1
+            self.db_seconds += seconds
+
+
+# Set per request by the metrics middleware. The object is shared with the
+# threadpool and task copies of the context, so their statements add up;
+# sessions in several threads may record at once, hence the lock.
+request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+template_render_seconds = Histogram(
+    "careops_template_render_seconds",
+    "Time spent rendering each page template.",
+    labels=("template",),
+)
+http_request_seconds = Histogram(
+    "careops_http_request_duration_seconds",
+    "Request latency by route template.",
+    labels=("method", "route", "status"),
+)
+db_statements_per_request = Histogram(
+    "careops_db_statements_per_request",
+    "SQL statements executed while handling a request.",
+    labels=("route",),
+    buckets=COUNT_BUCKETS,
+)
+db_seconds_per_request = Histogram(
+    "careops_db_seconds_per_request",
+    "Time spent in SQL statements while handling a request.",
+    labels=("route",),
+)
+db_statement_seconds = Histogram(
+    "careops_db_statement_seconds",
+    "Duration of individual SQL statements.",
+    labels=("engine",),
+)
+db_connection_acquire_seconds = Histogram(
+    "careops_db_connection_acquire_seconds",
+    "Time to get a connection from the pool, including waiting for a free one and opening a new one.",
+    labels=("engine",),
+)
+db_connections_opened = CounterMetric(
+    "careops_db_connections_opened_total",
+    "New database connections opened by the pool.",
+    labels=("engine",),
+)
+twilio_request_seconds = Histogram(
+    "careops_twilio_request_seconds",
+    "Latency of outbound Twilio API calls by outcome.",
+    labels=("outcome",),
+)
+twilio_errors = CounterMetric(
+    "careops_twilio_errors_total",
+    "Failed Twilio API calls by reason.",
+    labels=("reason",),
+)
+event_loop_lag_seconds = Histogram(
+    "careops_event_loop_lag_seconds",
+    "How late the event loop ran a timer that should have fired on time.",
+)
+
+METRICS = [
+    http_request_seconds,
+    db_statements_per_request,
+    db_seconds_per_request,
+    db_statement_seconds,
+    db_connection_acquire_seconds,
+    db_connections_opened,
+    template_render_seconds,
+    twilio_request_seconds,
+    twilio_errors,
+    event_loop_lag_seconds,
+]
@@ -1,24 +1,158 @@
+import asyncio
+import random
+import time
+
 import httpx
-from app.config import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_WHATSAPP_NUMBER
+from app.config import (
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    TWILIO_WHATSAPP_NUMBER,
+    TWILIO_API_BASE,
+    WHATSAPP_QUEUE_SIZE,
+    WHATSAPP_WORKERS,
+    WHATSAPP_MAX_RETRIES,
+    WHATSAPP_RETRY_BASE_DELAY,
+)
+from app.services.telemetry import twilio_errors, twilio_request_seconds
+from app.utils.phone import mask_phone, mask_phones
 import logging
 
 logger = logging.getLogger(__name__)
 
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Only errors before the request went out. After that (read timeouts, dropped
+# connections) Twilio may already have accepted the message, and a retry
+# would deliver it twice.
+RETRYABLE_TRANSPORT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+MAX_RETRY_DELAY = 30.0
+
+_client = None
+_queue = None
+_workers = []
+
+
+def _new_client():
+    return httpx.AsyncClient(
+        auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
+        timeout=httpx.Timeout(10.0, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=WHATSAPP_WORKERS,
+            max_keepalive_connections=WHATSAPP_WORKERS,
+            keepalive_expiry=60.0,
+        ),
+    )
+
+
+def _retry_delay(attempt: int, retry_after: str = None) -> float:
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_RETRY_DELAY)
+    delay = WHATSAPP_RETRY_BASE_DELAY * (2 ** attempt)
+    return min(delay, MAX_RETRY_DELAY) * random.uniform(0.5, 1.0)
+
+
+async def _post_with_retries(client: httpx.AsyncClient, to: str, body: str) -> bool:
+    url = f"{TWILIO_API_BASE}/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Messages.json"
+    data = {
+        "From": f"whatsapp:{TWILIO_WHATSAPP_NUMBER}",
+        "To": f"whatsapp:{to}",
+        "Body": body
+    }
+
+    for attempt in range(WHATSAPP_MAX_RETRIES + 1):
+        retry_after = None
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, data=data)
+        except httpx.TransportError as e:
+            twilio_request_seconds.observe(time.perf_counter() - start, "transport_error")
+            twilio_errors.inc(type(e).__name__)
+            if not isinstance(e, RETRYABLE_TRANSPORT_ERRORS):
+                logger.error(f"Twilio send to {mask_phone(to)} failed after the request was sent: {e}")
+                return False
+            logger.warning(f"Twilio request error (attempt {attempt + 1}): {e}")
+        else:
+            outcome = "ok" if response.status_code < 400 else str(response.status_code)
+            twilio_request_seconds.observe(time.perf_counter() - start, outcome)
+            if response.status_code < 400:
+                return True
+            twilio_errors.inc(str(response.status_code))
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                logger.error(f"Twilio send failed: {response.status_code} {mask_phones(response.text)}")
+                return False
+            retry_after = response.headers.get("Retry-After")
+            logger.warning(f"Twilio returned {response.status_code} (attempt {attempt + 1})")
+
+        if attempt < WHATSAPP_MAX_RETRIES:
+            await asyncio.sleep(_retry_delay(attempt, retry_after))
+
+    logger.error(f"Twilio send to {mask_phone(to)} gave up after {WHATSAPP_MAX_RETRIES + 1} attempts")
+    return False
+
+
+async def deliver_whatsapp_message(to: str, body: str) -> bool:
+    if _client is not None:
+        return await _post_with_retries(_client, to, body)
+
+    # Outside the app lifecycle (scripts, one-off tasks) there is no shared
+    # client, so fall back to a short-lived one.
+    async with _new_client() as client:
+        return await _post_with_retries(client, to, body)
+
+
+async def _worker():
+    while True:
+        to, body = await _queue.get()
+        try:
+            await deliver_whatsapp_message(to, body)
+        except Exception as e:
+            logger.error(f"Twilio send failed: {e}")
+        finally:
+            _queue.task_done()
+
+
+async def start_whatsapp_sender():
+    global _client, _queue
+    if not TWILIO_ACCOUNT_SID or _queue is not None:
+        return
+
+    _client = _new_client()
+    _queue = asyncio.Queue(maxsize=WHATSAPP_QUEUE_SIZE)
+    _workers.extend(asyncio.create_task(_worker()) for _ in range(WHATSAPP_WORKERS))
+
+
+async def stop_whatsapp_sender(timeout: float = 10.0):
+    global _client, _queue
+    if _queue is None:
+        return
+
+    try:
+        await asyncio.wait_for(_queue.join(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Dropping {_queue.qsize()} queued WhatsApp messages on shutdown")
+
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+    await _client.aclose()
+    _client = None
+    _queue = None
+
+
 async def send_whatsapp_message(to: str, body: str):
     if not TWILIO_ACCOUNT_SID:
         logger.warning("Twilio not configured.")
         return
 
-    try:
-        async with httpx.AsyncClient() as client:
-            await client.post(
-                f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Messages.json",
-                data={
-                    "From": f"whatsapp:{TWILIO_WHATSAPP_NUMBER}",
-                    "To": f"whatsapp:{to}",
-                    "Body": body
-                },
-                auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-            )
-    except Exception as e:
-        logger.error(f"Twilio send failed: {e}")
+    if _queue is None:
+        await deliver_whatsapp_message(to, body)
+        return
+
+    # Returns as soon as the message is queued; only waits when the queue is
+    # full, which pushes back on callers instead of growing without bound.
+    await _queue.put((to, body))
+
+
+def queued_messages() -> int:
+    return _queue.qsize() if _queue is not None else 0
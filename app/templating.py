@@ -0,0 +1,50 @@
+import os
+import time
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+
+from app.config import TEMPLATE_BYTECODE_CACHE, TEMPLATE_CACHE_DIR
+from app.services.telemetry import template_render_seconds
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+
+class TimedTemplate(jinja2.Template):
+    # Only top-level renders go through render(); the time for a page
+    # includes its base layout and includes.
+
+    def render(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            template_render_seconds.observe(time.perf_counter() - start, self.name)
+
+
+def _bytecode_cache():
+    if not TEMPLATE_BYTECODE_CACHE:
+        return None
+    if TEMPLATE_CACHE_DIR:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    return jinja2.FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+
+
+env = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+    autoescape=True,
+    bytecode_cache=_bytecode_cache(),
+)
+env.template_class = TimedTemplate
+
+# Shared by every router, so each template is compiled and cached once.
+templates = Jinja2Templates(env=env)
+
+
+def warm_templates() -> int:
+    # Compiles every template up front (filling the bytecode cache for the
+    # other workers) so the first request after a deploy doesn't pay for it.
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
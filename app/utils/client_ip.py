@@ -0,0 +1,32 @@
+import ipaddress
+
+from fastapi import Request
+
+from app.config import TRUSTED_PROXIES
+
+_trusted = [ipaddress.ip_network(proxy, strict=False) for proxy in TRUSTED_PROXIES]
+
+
+def _is_trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _trusted)
+
+
+def client_ip(request: Request) -> str:
+    # The address that connected, unless that is a trusted proxy: then walk
+    # X-Forwarded-For from the right (each proxy appends the address it saw)
+    # and take the first hop that isn't one of ours. Entries left of that
+    # are client-supplied and can't be trusted.
+    address = request.client.host if request.client else "unknown"
+    if not _is_trusted(address):
+        return address
+
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        address = hop
+        if not _is_trusted(hop):
+            break
+    return address
@@ -1,2 +1,41 @@
+import re
+
+from app.config import DEFAULT_COUNTRY_CODE
+
+# E.164 allows at most 15 digits including the country code, which never
+# starts with 0; anything shorter than 8 can't be a reachable mobile number.
+_E164_DIGITS = re.compile(r"[1-9][0-9]{7,14}")
+_SEPARATORS = re.compile(r"[\s\-.()/]")
+_PHONE_IN_TEXT = re.compile(r"\+?\d{8,15}")
+
+
 def normalize_phone(phone: str) -> str:
-    return phone.replace("whatsapp:", "").strip()
+    # Returns the canonical E.164 form ("+919876543210"), or "" when the
+    # input can't be a phone number. Accepts Twilio's "whatsapp:" prefix,
+    # the usual separators, and international "00" dialling.
+    phone = _SEPARATORS.sub("", phone.replace("whatsapp:", ""))
+
+    if phone.startswith("+"):
+        digits = phone[1:]
+    elif phone.startswith("00"):
+        digits = phone[2:]
+    elif DEFAULT_COUNTRY_CODE:
+        # National format: drop the trunk prefix before adding the code.
+        digits = DEFAULT_COUNTRY_CODE + phone.lstrip("0")
+    else:
+        digits = phone
+
+    if not _E164_DIGITS.fullmatch(digits):
+        return ""
+    return f"+{digits}"
+
+
+def mask_phone(phone: str) -> str:
+    # For logs: "+919876543210" -> "+********3210".
+    prefix = "+" if phone.startswith("+") else ""
+    digits = phone[len(prefix):]
+    return prefix + "*" * max(len(digits) - 4, 0) + digits[-4:]
+
+
+def mask_phones(text: str) -> str:
+    return _PHONE_IN_TEXT.sub(lambda match: mask_phone(match.group()), text)
@@ -0,0 +1,52 @@
+import threading
+import time
+
+
+class RateLimiter:
+    # Fixed-window counter per key, kept in process memory. Each worker
+    # enforces its own limit, which is enough to keep brute-force traffic
+    # from turning into bcrypt work.
+
+    def __init__(self, limit: int, window: float, max_keys: int = 100_000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def _current(self, key: str, now: float):
+        started, count = self._windows.get(key, (now, 0))
+        if now - started >= self.window:
+            return now, 0
+        return started, count
+
+    def retry_after(self, key: str) -> int:
+        # Seconds until `key` may try again, or 0 when it isn't limited.
+        now = time.monotonic()
+        with self._lock:
+            started, count = self._current(key, now)
+            if count < self.limit:
+                return 0
+            return max(1, int(started + self.window - now + 0.999))
+
+    def hit(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._windows) >= self.max_keys:
+                self._prune(now)
+            started, count = self._current(key, now)
+            self._windows[key] = (started, count + 1)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._windows.pop(key, None)
+
+    def _prune(self, now: float):
+        expired = [k for k, (started, _) in self._windows.items() if now - started >= self.window]
+        for key in expired:
+            del self._windows[key]
+        # Still full of live windows: drop the oldest half rather than grow.
+        if len(self._windows) >= self.max_keys:
+            oldest = sorted(self._windows, key=lambda k: self._windows[k][0])
+            for key in oldest[: len(oldest) // 2]:
+                del self._windows[key]
@@ -1,17 +1,78 @@
+import asyncio
 import bcrypt
 import hashlib
-from app.config import SECRET_CODE_SALT
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.config import (
+    SECRET_CODE_SALT,
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_QUEUE_SIZE,
+)
 
 
 # Password hashing (for users)
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
 
 
 def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode(), hashed.encode())
 
 
+def needs_rehash(hashed: str) -> bool:
+    # bcrypt hashes look like $2b$12$<salt+hash>; the middle field is the cost.
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+# Dedicated pool for the functions above
+class PasswordPoolBusy(Exception):
+    pass
+
+
+_hash_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_hash_lock = threading.Lock()
+_hash_stats = {"queued": 0, "running": 0, "completed": 0, "rejected": 0, "max_queued": 0}
+
+
+def submit_password_task(fn, *args):
+    # Refuses work once PASSWORD_HASH_QUEUE_SIZE tasks are waiting rather
+    # than letting a burst queue up minutes of hashing.
+    with _hash_lock:
+        if _hash_stats["queued"] >= PASSWORD_HASH_QUEUE_SIZE:
+            _hash_stats["rejected"] += 1
+            raise PasswordPoolBusy()
+        _hash_stats["queued"] += 1
+        _hash_stats["max_queued"] = max(_hash_stats["max_queued"], _hash_stats["queued"])
+
+    def run():
+        with _hash_lock:
+            _hash_stats["queued"] -= 1
+            _hash_stats["running"] += 1
+        try:
+            return fn(*args)
+        finally:
+            with _hash_lock:
+                _hash_stats["running"] -= 1
+                _hash_stats["completed"] += 1
+
+    return _hash_executor.submit(run)
+
+
+async def run_password_task(fn, *args):
+    return await asyncio.wrap_future(submit_password_task(fn, *args))
+
+
+def password_pool_stats() -> dict:
+    with _hash_lock:
+        return {"workers": PASSWORD_HASH_WORKERS, **_hash_stats}
+
+
 # Secret code hashing (for bookings)
 def hash_secret_code(code: str) -> str:
     return hashlib.sha256((code + SECRET_CODE_SALT).encode()).hexdigest()
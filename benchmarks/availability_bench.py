@@ -0,0 +1,94 @@
+"""Availability engine micro-benchmark.
+
+Builds an IntervalIndex over a synthetic calendar (100k bookings by
+default) and times free-slot queries and overlap checks against it.
+
+    python -m benchmarks.availability_bench [--bookings 100000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+# Nothing here touches the database, but importing app.models needs a URL.
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/careops_bench.db")
+
+from app.services.availability import IntervalIndex, compile_schedule  # noqa: E402
+
+
+def timed(label, fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<42} {elapsed * 1e6:12.1f} us")
+    return result
+
+
+def synthetic_calendar(schedule, bookings, seed):
+    # Fill consecutive working days until `bookings` slots are taken,
+    # skipping ~30% of slots so there is free capacity to find.
+    rng = random.Random(seed)
+    intervals = []
+    day = date(2024, 1, 1)
+    while len(intervals) < bookings:
+        for start in schedule.slot_starts(day):
+            if rng.random() < 0.7:
+                intervals.append((start, start + schedule.duration))
+                if len(intervals) == bookings:
+                    break
+        day += timedelta(days=1)
+    return intervals, day
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workspace = SimpleNamespace(
+        active_days="Mon,Tue,Wed,Thu,Fri,Sat",
+        active_hours_start="08:00",
+        active_hours_end="20:00",
+        default_service_duration_minutes=30,
+    )
+    schedule = timed("compile schedule", lambda: compile_schedule(workspace))
+    timed("compile schedule (cached)", lambda: compile_schedule(workspace), repeat=10_000)
+
+    intervals, last_day = synthetic_calendar(schedule, args.bookings, args.seed)
+    first_day = intervals[0][0].date()
+    span = (last_day - first_day).days
+    print(f"{len(intervals)} bookings over {span} days")
+
+    def build():
+        index = IntervalIndex()
+        for start, end in intervals:
+            index.add(start, end)
+        return index
+
+    index = timed("build index", build)
+
+    rng = random.Random(args.seed)
+    days = [first_day + timedelta(days=rng.randrange(span)) for _ in range(200)]
+    timed("free slots, 1 day (x200)", lambda: [index.free_slots(schedule, d, d) for d in days])
+    timed("free slots, 7 days (x200)", lambda: [index.free_slots(schedule, d, d + timedelta(days=6)) for d in days])
+    timed("free slots, 31 days (x200)", lambda: [index.free_slots(schedule, d, d + timedelta(days=30)) for d in days])
+
+    probes = [
+        datetime.combine(first_day, datetime.min.time()) + timedelta(minutes=15 * rng.randrange(span * 96))
+        for _ in range(args.queries)
+    ]
+    hits = timed(
+        f"overlap checks (x{args.queries})",
+        lambda: sum(index.overlaps(p, p + schedule.duration) for p in probes),
+    )
+    print(f"{hits} of {args.queries} probes overlapped a booking")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Client intake load benchmark.
+
+Drives /client/query, /client/booking and /client/feedback concurrently
+through the ASGI app in-process (no network, Twilio unconfigured) and
+reports throughput and latency percentiles.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.intake_bench --requests 2000 --concurrency 50
+
+Without DATABASE_URL a throwaway SQLite file is used.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+DEFAULT_DB = os.path.join(tempfile.gettempdir(), "careops_intake_bench.db")
+if "DATABASE_URL" not in os.environ:
+    if os.path.exists(DEFAULT_DB):
+        os.remove(DEFAULT_DB)
+    os.environ["DATABASE_URL"] = f"sqlite:///{DEFAULT_DB}"
+os.environ.pop("TWILIO_ACCOUNT_SID", None)
+# The throwaway database is migrated on startup, as the deploy step would.
+os.environ.setdefault("AUTO_MIGRATE", "true")
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+ONBOARDING = {
+    "business_name": "Bench Clinic",
+    "address_line": "1 Bench St",
+    "city": "Bench",
+    "state": "BN",
+    "postal_code": "00000",
+    "timezone": "UTC",
+    "active_days": "Mon,Tue,Wed,Thu,Fri,Sat,Sun",
+    "active_hours_start": "00:00",
+    "active_hours_end": "23:59",
+    "default_service_duration_minutes": "15",
+    "name": "Bench Owner",
+    "username": f"bench-owner-{random.randrange(10**9)}",
+    "password": "bench",
+}
+
+
+def form_request(i: int, phones: int, rng: random.Random):
+    phone = f"+1555{rng.randrange(phones):07d}"
+    kind = i % 3
+    if kind == 0:
+        return "/client/query", {"name": "Bench", "phone": phone, "message": f"query {i}"}
+    if kind == 1:
+        # 95 quarter-hour slots a day fit between 00:00 and 23:59.
+        slot = date(2031, 1, 1) + timedelta(days=i // 95)
+        minutes = 15 * (i % 95)
+        return "/client/booking", {
+            "name": "Bench",
+            "phone": phone,
+            "service_type": "bench",
+            "date": slot.isoformat(),
+            "time": f"{minutes // 60:02d}:{minutes % 60:02d}",
+        }
+    return "/client/feedback", {"name": "Bench", "phone": phone, "rating": "5", "feedback": f"feedback {i}"}
+
+
+async def run(requests: int, concurrency: int, phones: int, seed: int):
+    rng = random.Random(seed)
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/onboarding", data=ONBOARDING)
+
+            work = [form_request(i, phones, rng) for i in range(requests)]
+            latencies = []
+            failures = 0
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(path, data):
+                nonlocal failures
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post(path, data=data)
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code != 302:
+                        failures += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(path, data) for path, data in work))
+            elapsed = time.perf_counter() - started
+    finally:
+        await app.router.shutdown()
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000  # noqa: E731
+    print(f"requests      {requests} ({failures} failed)")
+    print(f"concurrency   {concurrency}")
+    print(f"throughput    {requests / elapsed:.1f} req/s")
+    print(f"latency p50   {pct(0.50):.1f} ms")
+    print(f"latency p95   {pct(0.95):.1f} ms")
+    print(f"latency p99   {pct(0.99):.1f} ms")
+    print(f"latency mean  {statistics.mean(latencies) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--phones", type=int, default=500, help="distinct client phone numbers")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.phones, args.seed))
+
+
+if __name__ == "__main__":
+    main()
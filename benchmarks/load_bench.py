@@ -0,0 +1,475 @@
+"""End-to-end load benchmark across the routers.
+
+Seeds a synthetic workspace (contacts, conversations with message history,
+bookings, inventory, staff), then drives a weighted mix of client intake,
+inbound webhooks, logins, the owner dashboard, the staff inbox and
+conversation pages concurrently through the ASGI app in-process. Outbound
+WhatsApp goes to the fake Twilio app (app.routers.fake_twilio), also
+in-process.
+
+Per scenario it reports p50/p95/p99 latency, throughput, SQL statements per
+request and time spent waiting on the connection pool.
+
+    python -m benchmarks.load_bench --requests 3000 --concurrency 40
+    python -m benchmarks.load_bench --save sqlite-local
+    python -m benchmarks.load_bench --compare sqlite-local
+
+--save writes benchmarks/baselines/<name>.json; --compare runs again and
+flags scenarios whose p95 or queries per request regressed beyond
+--tolerance, exiting non-zero if any did. Baselines are only comparable on
+the same machine and database. Without DATABASE_URL a throwaway SQLite file
+is used.
+"""
+import argparse
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_DB = os.path.join(tempfile.gettempdir(), "careops_load_bench.db")
+if "DATABASE_URL" not in os.environ:
+    if os.path.exists(DEFAULT_DB):
+        os.remove(DEFAULT_DB)
+    os.environ["DATABASE_URL"] = f"sqlite:///{DEFAULT_DB}"
+
+# Twilio is configured but pointed at the in-process fake below.
+os.environ["TWILIO_ACCOUNT_SID"] = "ACbench"
+os.environ["TWILIO_AUTH_TOKEN"] = "bench"
+os.environ["TWILIO_WHATSAPP_NUMBER"] = "+15550000000"
+os.environ["TWILIO_API_BASE"] = "http://fake-twilio"
+# httpx's in-process transport connects from 127.0.0.1; treat it as the
+# reverse proxy so each request's simulated client address is used.
+os.environ.setdefault("TRUSTED_PROXIES", "127.0.0.1")
+# The throwaway database is migrated on startup, as the deploy step would.
+os.environ.setdefault("AUTO_MIGRATE", "true")
+
+import httpx  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+
+from app import database  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import (  # noqa: E402
+    Base,
+    Booking,
+    Contact,
+    Conversation,
+    Inventory,
+    Message,
+    Ticket,
+    User,
+    Workspace,
+)
+from app.routers import fake_twilio  # noqa: E402
+from app.services import whatsapp_service  # noqa: E402
+from app.utils.security import hash_password, hash_secret_code  # noqa: E402
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+SECRET_CODE = "123456"
+PASSWORD = "bench"
+
+SCENARIOS = {
+    # name: (weight, expected status codes)
+    "client_query": (10, {302}),
+    "client_booking": (5, {302, 409}),
+    "client_feedback": (5, {302}),
+    "webhook": (20, {200}),
+    "login": (5, {302}),
+    "owner_dashboard": (10, {200}),
+    "staff_inbox": (20, {200}),
+    "staff_conversation": (25, {200}),
+}
+
+
+# =========================
+# INSTRUMENTATION
+# =========================
+
+class RequestStats:
+    __slots__ = ("queries", "pool_wait")
+
+    def __init__(self):
+        self.queries = 0
+        self.pool_wait = 0.0
+
+
+# Set around each benchmark request. The ASGI transport runs the app in the
+# caller's context and threadpool routes copy it, so app-side hooks see the
+# same object. Background workers have no stats and are not counted.
+current_stats = contextvars.ContextVar("current_stats", default=None)
+
+
+def instrument(sync_engine):
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        stats = current_stats.get()
+        if stats is not None:
+            stats.queries += 1
+
+    pool = sync_engine.pool
+    do_get = pool._do_get
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            stats = current_stats.get()
+            if stats is not None:
+                stats.pool_wait += time.perf_counter() - start
+
+    pool._do_get = timed_do_get
+
+
+def fake_twilio_client():
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake_twilio.app),
+        base_url="http://fake-twilio",
+        auth=("ACbench", "bench"),
+    )
+
+
+# =========================
+# SEED DATA
+# =========================
+
+def seed(contacts: int, messages: int, staff: int, items: int, seed_value: int):
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+    password_hash = hash_password(PASSWORD)
+    code_hash = hash_secret_code(SECRET_CODE)
+
+    db = database.SessionLocal()
+    try:
+        # Rows below reference each other by position, which relies on the
+        # ids of a fresh database starting at 1.
+        if db.query(Contact.id).first() is not None:
+            raise SystemExit("The benchmark needs an empty database.")
+
+        db.add(Workspace(
+            business_name="Bench Clinic",
+            address_line="1 Bench St",
+            city="Bench",
+            state="BN",
+            postal_code="00000",
+            timezone="UTC",
+            active_days="Mon,Tue,Wed,Thu,Fri,Sat,Sun",
+            active_hours_start="00:00",
+            active_hours_end="23:59",
+            default_service_duration_minutes=15,
+            is_active=True,
+        ))
+        db.execute(insert(User), [
+            {"name": "Bench Owner", "username": "owner", "password_hash": password_hash, "role": "owner"},
+            *(
+                {"name": f"Staff {i}", "username": f"staff{i}", "password_hash": password_hash, "role": "staff"}
+                for i in range(staff)
+            ),
+        ])
+        db.execute(insert(Contact), [
+            {"name": f"Contact {i}", "phone": f"+1555{i:07d}"} for i in range(contacts)
+        ])
+
+        conversations = []
+        message_rows = []
+        for i in range(contacts):
+            started = now - timedelta(days=rng.randrange(1, 90))
+            times = sorted(started + timedelta(minutes=rng.randrange(60 * 24 * 30)) for _ in range(messages))
+            for m, ts in enumerate(times):
+                message_rows.append({
+                    "conversation_id": i + 1,
+                    "sender": "client" if m % 2 == 0 else "staff",
+                    "body": f"message {m} for contact {i}",
+                    "timestamp": ts,
+                })
+            conversations.append({
+                "contact_id": i + 1,
+                "status": "open",
+                "last_message_at": times[-1] if times else started,
+                "last_message_preview": message_rows[-1]["body"] if times else None,
+                "unread_count": rng.randrange(3),
+            })
+        db.execute(insert(Conversation), conversations)
+        for start in range(0, len(message_rows), 5000):
+            db.execute(insert(Message), message_rows[start:start + 5000])
+
+        # A pending booking for every fifth contact, in a year the intake
+        # scenario doesn't book into, so webhooks have codes to confirm.
+        tickets = []
+        bookings = []
+        for i in range(0, contacts, 5):
+            start = datetime(2029, 1, 1) + timedelta(minutes=15 * i)
+            tickets.append({
+                "ticket_number": f"TCK-B{i:07d}",
+                "form_type": "booking",
+                "contact_id": i + 1,
+                "conversation_id": i + 1,
+            })
+            bookings.append({
+                "ticket_id": len(tickets),
+                "contact_id": i + 1,
+                "service_type": "bench",
+                "start_time": start,
+                "end_time": start + timedelta(minutes=15),
+                "status": "pending",
+                "secret_code_hash": code_hash,
+            })
+        if tickets:
+            db.execute(insert(Ticket), tickets)
+            db.execute(insert(Booking), bookings)
+
+        db.execute(insert(Inventory), [
+            {"name": f"item {i}", "quantity": rng.randrange(20), "threshold": 5} for i in range(items)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+# =========================
+# WORKLOAD
+# =========================
+
+def build_request(name: str, i: int, contacts: int, rng: random.Random):
+    if name == "client_query":
+        return "POST", "/client/query", {
+            "name": "Bench", "phone": f"+1556{rng.randrange(contacts * 2):07d}", "message": f"query {i}",
+        }
+    if name == "client_booking":
+        # 95 quarter-hour slots a day fit between 00:00 and 23:59.
+        slot = datetime(2031, 1, 1) + timedelta(days=i // 95, minutes=15 * (i % 95))
+        return "POST", "/client/booking", {
+            "name": "Bench",
+            "phone": f"+1556{rng.randrange(contacts * 2):07d}",
+            "service_type": "bench",
+            "date": slot.strftime("%Y-%m-%d"),
+            "time": slot.strftime("%H:%M"),
+        }
+    if name == "client_feedback":
+        return "POST", "/client/feedback", {
+            "name": "Bench", "phone": f"+1555{rng.randrange(contacts):07d}", "rating": "5", "feedback": f"ok {i}",
+        }
+    if name == "webhook":
+        return "POST", "/webhook/whatsapp", {
+            "MessageSid": f"SMbench{i:08d}",
+            "From": f"whatsapp:+1555{rng.randrange(contacts):07d}",
+            "Body": SECRET_CODE if rng.random() < 0.2 else f"inbound {i}",
+        }
+    if name == "login":
+        return "POST", "/login", {"username": "staff0", "password": PASSWORD}
+    if name == "owner_dashboard":
+        return "GET", "/owner", None
+    if name == "staff_inbox":
+        return "GET", "/staff/inbox", None
+    return "GET", f"/staff/conversation/{rng.randrange(1, contacts + 1)}", None
+
+
+def client_for(name: str, clients: dict):
+    if name == "owner_dashboard":
+        return clients["owner"]
+    if name.startswith("staff_"):
+        return clients["staff"]
+    return clients["anonymous"]
+
+
+async def login(client: httpx.AsyncClient, username: str):
+    response = await client.post("/login", data={"username": username, "password": PASSWORD})
+    if response.status_code != 302:
+        raise RuntimeError(f"Could not log in as {username}: {response.status_code}")
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+
+    Base.metadata.create_all(bind=database.engine)
+    started = time.perf_counter()
+    seed(args.contacts, args.messages, args.staff, args.items, args.seed)
+    seed_time = time.perf_counter() - started
+
+    instrument(database.engine)
+    if database.async_engine is not None:
+        instrument(database.async_engine.sync_engine)
+    for replica in database.replica_engines:
+        instrument(replica)
+    whatsapp_service._new_client = fake_twilio_client
+
+    names = list(SCENARIOS)
+    weights = [SCENARIOS[name][0] for name in names]
+    work = [(name, build_request(name, i, args.contacts, rng))
+            for i, name in enumerate(rng.choices(names, weights, k=args.requests))]
+
+    results = defaultdict(lambda: {"latencies": [], "queries": [], "pool_wait": [], "errors": 0})
+
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        clients = {
+            role: httpx.AsyncClient(transport=transport, base_url="http://bench", follow_redirects=False)
+            for role in ("owner", "staff", "anonymous")
+        }
+        await login(clients["owner"], "owner")
+        await login(clients["staff"], "staff0")
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        addresses = itertools.count()
+
+        async def one(name, request):
+            method, path, data = request
+            client = client_for(name, clients)
+            async with semaphore:
+                stats = RequestStats()
+                token = current_stats.set(stats)
+                start = time.perf_counter()
+                try:
+                    n = next(addresses)
+                    headers = {"X-Forwarded-For": f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"}
+                    response = await client.request(method, path, data=data, headers=headers)
+                    ok = response.status_code in SCENARIOS[name][1]
+                except Exception:
+                    ok = False
+                finally:
+                    elapsed = time.perf_counter() - start
+                    current_stats.reset(token)
+
+            result = results[name]
+            result["latencies"].append(elapsed)
+            result["queries"].append(stats.queries)
+            result["pool_wait"].append(stats.pool_wait)
+            result["errors"] += not ok
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(name, request) for name, request in work))
+        elapsed = time.perf_counter() - started
+
+        for client in clients.values():
+            await client.aclose()
+    finally:
+        await app.router.shutdown()
+
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "contacts": args.contacts,
+            "messages": args.messages,
+            "database": database.engine.dialect.name,
+            "database_mode": os.environ.get("DATABASE_MODE", "async"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "seed_seconds": round(seed_time, 2),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput": round(args.requests / elapsed, 1),
+        "scenarios": {name: summarize(results[name], elapsed) for name in names if name in results},
+    }
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def summarize(result, elapsed) -> dict:
+    latencies = result["latencies"]
+    return {
+        "count": len(latencies),
+        "errors": result["errors"],
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "queries_per_request": round(statistics.mean(result["queries"]), 2),
+        "pool_wait_ms": round(statistics.mean(result["pool_wait"]) * 1000, 3),
+    }
+
+
+# =========================
+# REPORTING
+# =========================
+
+def report(summary: dict):
+    config = summary["config"]
+    print(
+        f"{config['database']} ({config['database_mode']}), {config['requests']} requests, "
+        f"concurrency {config['concurrency']}, {config['contacts']} contacts x {config['messages']} messages"
+    )
+    print(f"seeded in {summary['seed_seconds']}s, ran in {summary['elapsed_seconds']}s, "
+          f"{summary['throughput']} req/s overall\n")
+    header = f"{'scenario':<20}{'count':>7}{'err':>5}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'pool ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, s in summary["scenarios"].items():
+        print(
+            f"{name:<20}{s['count']:>7}{s['errors']:>5}{s['throughput']:>8}{s['p50_ms']:>9}"
+            f"{s['p95_ms']:>9}{s['p99_ms']:>9}{s['queries_per_request']:>9}{s['pool_wait_ms']:>9}"
+        )
+
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    differing = [key for key, value in summary["config"].items() if baseline["config"].get(key) != value]
+    if differing:
+        print(f"\nwarning: baseline was recorded with different {', '.join(differing)}")
+    print(f"\n{'scenario':<20}{'p95 ms':>18}{'queries/request':>22}")
+    for name, current in summary["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if not previous:
+            continue
+        p95_change = current["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0
+        flags = []
+        if p95_change > tolerance:
+            flags.append("p95")
+        if current["queries_per_request"] > previous["queries_per_request"] + 0.5:
+            flags.append("queries")
+        if flags:
+            regressions.append((name, flags))
+        print(
+            f"{name:<20}{previous['p95_ms']:>8} -> {current['p95_ms']:<8}"
+            f"{previous['queries_per_request']:>10} -> {current['queries_per_request']:<8}"
+            f"{'REGRESSED: ' + ', '.join(flags) if flags else ''}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--contacts", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=20, help="messages per seeded conversation")
+    parser.add_argument("--staff", type=int, default=5)
+    parser.add_argument("--items", type=int, default=50, help="inventory items")
+    parser.add_argument("--seed", type=int, default=20)
+    parser.add_argument("--save", metavar="NAME", help="store the results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare against a stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 increase (fraction)")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    report(summary)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+            f.write("\n")
+        print(f"\nbaseline written to {path}")
+
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        if compare(summary, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+# app.config reads the environment at import time, so point it at a
+# throwaway database before any app module is imported.
+TEST_DB = os.path.join(tempfile.mkdtemp(prefix="careops-tests-"), "careops.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest  # noqa: E402
+
+from app import models  # noqa: E402,F401
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.models import Contact, Conversation  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    Base.metadata.create_all(bind=engine)
+    run_migrations()
+
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    yield
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def conversation(db):
+    contact = Contact(name="Asha Rao", phone="+919876543210")
+    db.add(contact)
+    db.flush()
+    conversation = Conversation(contact_id=contact.id)
+    db.add(conversation)
+    db.commit()
+    return conversation
+
+
+@pytest.fixture
+def owner_client(db):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.models import User
+    from app.utils.security import hash_password
+
+    db.add(User(name="Owner", username="owner", password_hash=hash_password("pw"), role="owner"))
+    db.commit()
+    with TestClient(app) as client:
+        response = client.post("/login", data={"username": "owner", "password": "pw"}, follow_redirects=False)
+        assert response.status_code == 302
+        yield client
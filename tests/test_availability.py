@@ -0,0 +1,82 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.database import DATABASE_URL, SyncSessionAdapter
+from app.models import Booking
+from app.services.availability import compile_schedule, reserve_slot, workspace_now
+
+WORKSPACE = SimpleNamespace(
+    active_days="Mon,Tue,Wed,Thu,Fri",
+    active_hours_start="09:00",
+    active_hours_end="17:00",
+    default_service_duration_minutes=30,
+    timezone="Asia/Kolkata",
+)
+MONDAY = date(2026, 10, 19)
+
+
+def at(hour: int, minute: int = 0) -> datetime:
+    return datetime(MONDAY.year, MONDAY.month, MONDAY.day, hour, minute)
+
+
+def test_accepts_matches_offered_slots():
+    schedule = compile_schedule(WORKSPACE)
+
+    assert schedule.accepts(at(16, 30))
+    assert not schedule.accepts(at(16, 45))
+    assert not schedule.accepts(at(17))
+    assert all(schedule.accepts(start) for start in schedule.slot_starts(MONDAY))
+
+
+def test_workspace_now_uses_workspace_timezone():
+    expected = datetime.now(timezone.utc) + timedelta(hours=5, minutes=30)
+
+    assert abs(workspace_now(WORKSPACE) - expected.replace(tzinfo=None)) < timedelta(seconds=5)
+
+
+def test_workspace_now_falls_back_for_unknown_timezone():
+    workspace = SimpleNamespace(timezone="Not/AZone")
+
+    assert abs(workspace_now(workspace) - datetime.now()) < timedelta(seconds=5)
+
+
+def booking(start: datetime) -> Booking:
+    return Booking(
+        service_type="Consultation",
+        start_time=start,
+        end_time=start + timedelta(minutes=30),
+        secret_code_hash="x",
+    )
+
+
+def test_sqlite_reservations_are_serialized():
+    # A short busy timeout so the blocked booking fails fast instead of
+    # waiting for the first one to commit.
+    engine = create_engine(DATABASE_URL, connect_args={"timeout": 0.1})
+    first = SyncSessionAdapter(Session(bind=engine))
+    second = SyncSessionAdapter(Session(bind=engine))
+    start, end = at(10), at(10, 30)
+
+    async def run():
+        assert await reserve_slot(first, start, end)
+        with pytest.raises(OperationalError, match="locked"):
+            await reserve_slot(second, start, end)
+        await second.rollback()
+
+        first.add(booking(start))
+        await first.commit()
+        assert not await reserve_slot(second, start, end)
+
+    try:
+        asyncio.run(run())
+    finally:
+        first.sync_session.close()
+        second.sync_session.close()
+        engine.dispose()
+
@@ -0,0 +1,48 @@
+import io
+
+import pytest
+
+from app.models import Contact
+from app.services.bulk_import import MalformedInput, import_stream
+
+
+def upload(client, kind: str, filename: str, content: bytes):
+    return client.post(f"/owner/import/{kind}", files={"file": (filename, content)})
+
+
+@pytest.mark.parametrize(
+    "filename, content",
+    [
+        ("contacts.csv", b"name,phone\nAsha,+919876543210\n\x00Ravi,+919876543211\n"),
+        ("contacts.csv", b'name,phone\n"Asha"x,+919876543210\n'),
+        ("contacts.csv", b"name,phone\nAsha,+91987654\xff3210\n"),
+        ("contacts.ndjson", b'{"name": "Asha", "phone": "+919876543210"}\n["Ravi", "+919876543211"]\n'),
+        ("contacts.ndjson", b'"+919876543210"\n'),
+        ("contacts.ndjson", b'{"name": "Asha", "phone": "+9198765\n'),
+        ("contacts.ndjson", b'{"name": {"first": "Asha"}, "phone": "+919876543210"}\n'),
+        ("tickets.ndjson", b'{"phone": "+919876543210", "ticket_number": "T1", "created_at": "yesterday"}\n'),
+    ],
+)
+def test_malformed_uploads_are_rejected(owner_client, filename, content):
+    kind = filename.split(".")[0]
+
+    response = upload(owner_client, kind, filename, content)
+
+    assert response.status_code == 400
+    assert response.json()["error"].startswith("Malformed")
+
+
+def test_ndjson_numbers_are_read_as_text(db):
+    stream = io.StringIO('{"name": "Asha", "phone": 919876543210}\n')
+
+    progress = import_stream("contacts", stream, "ndjson")
+
+    assert progress.inserted == 1
+    assert db.query(Contact).one().phone == "+919876543210"
+
+
+def test_import_reports_the_bad_line():
+    stream = io.StringIO('{"name": "Asha", "phone": "+919876543210"}\n\n42\n')
+
+    with pytest.raises(MalformedInput, match="line 3"):
+        import_stream("contacts", stream, "ndjson")
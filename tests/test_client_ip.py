@@ -0,0 +1,33 @@
+import ipaddress
+
+import pytest
+from starlette.requests import Request
+
+from app.utils import client_ip as client_ip_module
+from app.utils.client_ip import client_ip
+
+
+def request(peer: str, forwarded: str = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "method": "POST", "path": "/login", "headers": headers, "client": (peer, 1234)})
+
+
+@pytest.fixture(autouse=True)
+def trusted_proxies(monkeypatch):
+    monkeypatch.setattr(client_ip_module, "_trusted", [ipaddress.ip_network("10.0.0.0/8")])
+
+
+def test_direct_clients_cannot_spoof_forwarded_for():
+    assert client_ip(request("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+
+def test_client_behind_trusted_proxy():
+    assert client_ip(request("10.0.0.2", "198.51.100.1")) == "198.51.100.1"
+
+
+def test_spoofed_hops_left_of_the_client_are_ignored():
+    assert client_ip(request("10.0.0.2", "1.2.3.4, 198.51.100.1, 10.0.0.5")) == "198.51.100.1"
+
+
+def test_trusted_proxy_without_header_is_the_client():
+    assert client_ip(request("10.0.0.2")) == "10.0.0.2"
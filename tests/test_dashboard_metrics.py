@@ -0,0 +1,20 @@
+from app.models import Contact, Inventory
+from app.services import dashboard_metrics
+from app.services.dashboard_metrics import compute_dashboard_metrics, get_dashboard_metrics, rebuild_dashboard_counters
+
+
+def test_counters_track_changes_after_rebuild(db, monkeypatch):
+    monkeypatch.setattr(dashboard_metrics, "DASHBOARD_COUNTERS", True)
+    db.add(Contact(name="Asha Rao", phone="+919876543210"))
+    db.add(Inventory(name="Gloves", quantity=2, threshold=5))
+    db.commit()
+
+    rebuild_dashboard_counters(db)
+    db.add(Contact(name="Ravi Iyer", phone="+919876543211"))
+    db.query(Inventory).one().quantity = 20
+    db.commit()
+
+    metrics = get_dashboard_metrics(db)
+    assert metrics == compute_dashboard_metrics(db)
+    assert metrics["total_leads"] == 2
+    assert metrics["low_stock"] == 0
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import text
+
+from app import middleware
+from app.models import User
+from app.services.realtime import broker
+
+
+@pytest.fixture
+def user(db):
+    user = User(name="Asha", username="asha", password_hash="x", role="staff")
+    db.add(user)
+    db.commit()
+    middleware.invalidate_all_users()
+    yield user
+    middleware.invalidate_all_users()
+
+
+def change_role_elsewhere(db, user_id: int, role: str):
+    # A write by another worker: this process sees no ORM flush for it.
+    db.execute(text("UPDATE users SET role = :role WHERE id = :id"), {"role": role, "id": user_id})
+    db.commit()
+
+
+def test_role_change_is_announced_to_other_workers(db, user):
+    user.role = "owner"
+    db.flush()
+
+    assert {"type": "users_changed", "user_ids": [user.id]} in db.info["realtime_events"]
+    db.commit()
+
+
+def test_other_workers_change_drops_cached_identity(db, user):
+    assert middleware.load_user(db, user.id).role == "staff"
+    change_role_elsewhere(db, user.id, "owner")
+    assert middleware.load_user(db, user.id).role == "staff"
+
+    broker.dispatch({"type": "users_changed", "user_ids": [user.id]})
+
+    assert middleware.load_user(db, user.id).role == "owner"
+
+
+def test_resync_drops_every_cached_identity(db, user):
+    middleware.load_user(db, user.id)
+    change_role_elsewhere(db, user.id, "owner")
+
+    broker.dispatch({"type": "resync"})
+
+    assert middleware.load_user(db, user.id).role == "owner"
@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app import database
+from app.models import Booking, Contact, Conversation, InboundMessage, Message
+from app.services import inbound_queue
+from app.utils.security import hash_secret_code
+
+PHONES = ["+15550000001", "+15550000002", "+15550000003"]
+
+
+def drain():
+    async def run():
+        try:
+            return await inbound_queue.drain_once()
+        finally:
+            if database.async_engine is not None:
+                await database.async_engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_failed_reply_does_not_reprocess_the_batch(db, monkeypatch):
+    start = datetime.now(timezone.utc) + timedelta(days=1)
+    for index, phone in enumerate(PHONES):
+        contact = Contact(name=f"Client {index}", phone=phone)
+        db.add(contact)
+        db.flush()
+        db.add(Conversation(contact_id=contact.id))
+        db.add(Booking(
+            contact_id=contact.id,
+            service_type="Consultation",
+            start_time=start,
+            end_time=start + timedelta(minutes=30),
+            secret_code_hash=hash_secret_code("1234"),
+        ))
+        db.add(InboundMessage(message_sid=f"SM{index}", from_number=f"whatsapp:{phone}", body="1234"))
+    db.commit()
+
+    sent = []
+
+    async def failing_send(to, body):
+        sent.append(to)
+        raise RuntimeError("Twilio is down")
+
+    monkeypatch.setattr(inbound_queue, "send_whatsapp_message", failing_send)
+
+    assert drain() == 3
+
+    assert db.query(Message).count() == 3
+    assert sorted(sent) == PHONES
+    assert {row.status for row in db.query(InboundMessage)} == {"done"}
+    assert {booking.status for booking in db.query(Booking)} == {"confirmed"}
+
+
+def test_settled_rows_are_not_processed_again(db):
+    contact = Contact(name="Client", phone=PHONES[0])
+    db.add(contact)
+    db.flush()
+    db.add(Conversation(contact_id=contact.id))
+    db.add(InboundMessage(message_sid="SM1", from_number=PHONES[0], body="hi", status="done", attempts=1))
+    db.commit()
+    row = db.query(InboundMessage).one()
+
+    async def run():
+        session = database.new_async_session()
+        try:
+            return await inbound_queue.process_batch(session, [row])
+        finally:
+            await session.close()
+            if database.async_engine is not None:
+                await database.async_engine.dispose()
+
+    assert asyncio.run(run()) == []
+    assert db.query(Message).count() == 0
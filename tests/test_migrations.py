@@ -0,0 +1,64 @@
+import importlib
+
+import pytest
+from sqlalchemy import text
+
+from app.database import engine
+
+canonical_phones = importlib.import_module("app.migrations.versions.0004_canonical_phones")
+
+
+@pytest.fixture
+def conn():
+    # Each test's migration run is rolled back, schema changes included.
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        yield connection
+        transaction.rollback()
+
+
+def add_contact(conn, contact_id: int, phone: str):
+    conn.execute(
+        text("INSERT INTO contacts (id, name, phone) VALUES (:id, :name, :phone)"),
+        {"id": contact_id, "name": f"Contact {contact_id}", "phone": phone},
+    )
+
+
+def phones(conn) -> dict:
+    return dict(conn.execute(text("SELECT id, phone FROM contacts ORDER BY id")).all())
+
+
+def test_refuses_national_numbers_without_country_code(conn):
+    add_contact(conn, 1, "09876543210")
+    add_contact(conn, 2, "+91 98765 43211")
+
+    with pytest.raises(RuntimeError, match="DEFAULT_COUNTRY_CODE"):
+        canonical_phones.upgrade(conn, country_code="")
+
+    assert phones(conn) == {1: "09876543210", 2: "+91 98765 43211"}
+
+
+def test_international_numbers_need_no_country_code(conn):
+    add_contact(conn, 1, "+91 98765 43210")
+
+    canonical_phones.upgrade(conn, country_code="")
+
+    assert phones(conn) == {1: "+919876543210"}
+
+
+def test_merges_are_recorded(conn):
+    add_contact(conn, 1, "+91 98765 43210")
+    add_contact(conn, 2, "09876543210")
+    add_contact(conn, 3, "0044 20 7946 0958")
+
+    canonical_phones.upgrade(conn, country_code="91")
+
+    assert phones(conn) == {1: "+919876543210", 3: "+442079460958"}
+    changes = conn.execute(
+        text("SELECT contact_id, old_phone, new_phone, merged_into FROM contact_phone_changes ORDER BY contact_id")
+    ).all()
+    assert [tuple(row) for row in changes] == [
+        (1, "+91 98765 43210", "+919876543210", None),
+        (2, "09876543210", "+919876543210", 1),
+        (3, "0044 20 7946 0958", "+442079460958", None),
+    ]
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.responses import HTMLResponse
+from sqlalchemy import create_engine
+from starlette.requests import Request
+
+from app import database
+from app.database import Base, ReadSessionLocal, SessionLocal
+from app.models import Contact
+from app.services import page_cache
+
+OWNER = SimpleNamespace(id=1, role="owner")
+
+
+def owner_request():
+    return Request({"type": "http", "method": "GET", "path": "/owner", "query_string": b"", "headers": []})
+
+
+@pytest.fixture
+def caching(monkeypatch):
+    monkeypatch.setattr(page_cache, "ENABLED", True)
+    monkeypatch.setattr(page_cache, "PAGE_CACHE_TTL", 60)
+    page_cache.page_cache.invalidate()
+    yield
+    page_cache.page_cache.invalidate()
+
+
+@pytest.fixture
+def lagging_replica(tmp_path, monkeypatch):
+    # A replica that hasn't received any of the primary's rows yet.
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=replica)
+    monkeypatch.setattr(database, "replica_engines", [replica])
+    yield replica
+    replica.dispose()
+
+
+def contact_count_page(db):
+    return lambda: HTMLResponse(f"contacts={db.query(Contact).count()}")
+
+
+def test_replica_pages_are_not_cached_or_tagged(db, caching, lagging_replica):
+    db.add(Contact(name="Asha Rao", phone="+919876543210"))
+    db.commit()
+
+    replica_db = ReadSessionLocal()
+    try:
+        response = page_cache.cached_page(
+            owner_request(), OWNER, replica_db, ("contacts",), contact_count_page(replica_db)
+        )
+    finally:
+        replica_db.close()
+
+    assert response.body == b"contacts=0"
+    assert "etag" not in response.headers
+    assert page_cache.page_cache.stats()["size"] == 0
+
+
+def test_primary_pages_are_cached_and_tagged(db, caching):
+    db.add(Contact(name="Asha Rao", phone="+919876543210"))
+    db.commit()
+
+    primary_db = SessionLocal()
+    try:
+        response = page_cache.cached_page(
+            owner_request(), OWNER, primary_db, ("contacts",), contact_count_page(primary_db)
+        )
+    finally:
+        primary_db.close()
+
+    assert response.body == b"contacts=1"
+    assert response.headers["etag"].startswith('W/"')
+    assert page_cache.page_cache.stats()["size"] == 1
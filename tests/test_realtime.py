@@ -0,0 +1,45 @@
+import json
+
+from app.models import Message
+from app.services import realtime
+
+LONG_HINDI = "नमस्ते, मेरा ऑर्डर टूटा हुआ आया है। " * 80
+
+
+def test_message_event_fits_notify_payload():
+    message = Message(id=1, conversation_id=1, sender="client", body=LONG_HINDI)
+
+    event = realtime.message_event(message)
+
+    assert len(json.dumps(event, default=str).encode()) <= realtime.MAX_PAYLOAD_BYTES
+    assert event["message"]["truncated"]
+    assert LONG_HINDI.startswith(event["message"]["body"])
+
+
+def test_short_message_event_is_complete():
+    message = Message(id=1, conversation_id=1, sender="client", body="Hello")
+
+    event = realtime.message_event(message)
+
+    assert event["message"]["body"] == "Hello"
+    assert not event["message"]["truncated"]
+
+
+def test_failed_notify_does_not_abort_the_write(db, conversation, monkeypatch):
+    # SQLite has no pg_notify, so every NOTIFY fails here.
+    monkeypatch.setattr(realtime, "REALTIME_BACKEND", "postgres")
+
+    db.add(Message(conversation_id=conversation.id, sender="client", body=LONG_HINDI))
+    db.commit()
+
+    assert db.query(Message).filter_by(conversation_id=conversation.id).count() == 1
+
+
+def test_oversized_event_is_dropped(db, monkeypatch):
+    monkeypatch.setattr(realtime, "REALTIME_BACKEND", "postgres")
+    sent = []
+    monkeypatch.setattr(db, "connection", lambda: sent.append(True))
+
+    realtime.emit(db, {"type": "message", "body": "x" * realtime.MAX_PAYLOAD_BYTES})
+
+    assert not sent
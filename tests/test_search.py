@@ -0,0 +1,39 @@
+from app.models import Contact, Message
+from app.services.search import search, search_contacts
+
+
+def add_contact(db, name: str, phone: str) -> Contact:
+    contact = Contact(name=name, phone=phone)
+    db.add(contact)
+    db.commit()
+    return contact
+
+
+def test_partial_phone_matches_any_part_of_the_number(db):
+    asha = add_contact(db, "Asha", "+919876543210")
+    ravi = add_contact(db, "Ravi", "+14155550123")
+
+    assert [hit.id for hit in search_contacts(db, "3210", [])] == [asha.id]
+    assert [hit.id for hit in search_contacts(db, "555 01", [])] == [ravi.id]
+    assert [hit.id for hit in search_contacts(db, "98765", [])] == [asha.id]
+    assert search_contacts(db, "777", []) == []
+
+
+def test_partial_phone_index_follows_updates(db):
+    contact = add_contact(db, "Asha", "+919876543210")
+    contact.phone = "+14155550123"
+    db.commit()
+
+    assert search_contacts(db, "3210", []) == []
+    assert [hit.id for hit in search_contacts(db, "5550", [])] == [contact.id]
+
+
+def test_search_finds_messages_and_contacts(db, conversation):
+    db.add(Message(conversation_id=conversation.id, sender="customer", body="Is the clinic open on Sunday?"))
+    db.commit()
+
+    results = search(db, "sunday")
+    assert [hit.conversation_id for hit in results.messages] == [conversation.id]
+
+    results = search(db, "43210")
+    assert [hit.id for hit in results.contacts] == [conversation.contact_id]
@@ -0,0 +1,37 @@
+import asyncio
+import logging
+
+from app.models import Inventory
+from app.services import stock_alerts
+from app.services.realtime import stock_item
+from app.services.stock_alerts import current_low_stock, low_stock
+
+
+def test_memory_backend_reads_low_stock_from_the_database(db, monkeypatch):
+    monkeypatch.setattr(stock_alerts, "REALTIME_BACKEND", "memory")
+    # As if another worker restocked this item and this one never heard.
+    low_stock.replace([stock_item(99, "Masks", 0, 5, was_low=True)])
+    db.add(Inventory(name="Gloves", quantity=1, threshold=5))
+    db.add(Inventory(name="Syringes", quantity=50, threshold=5))
+    db.commit()
+
+    assert [item["name"] for item in current_low_stock(db)] == ["Gloves"]
+
+
+def test_digest_send_is_tracked_and_failures_are_logged(monkeypatch, caplog):
+    async def failing_send(to, body):
+        raise RuntimeError("Twilio is down")
+
+    monkeypatch.setattr(stock_alerts, "send_whatsapp_message", failing_send)
+    monkeypatch.setattr(stock_alerts, "_take_digest", lambda: "Low stock alert:\n- Gloves: 1 left")
+
+    async def run():
+        stock_alerts._send_digest()
+        assert len(stock_alerts._digest_tasks) == 1
+        await asyncio.gather(*stock_alerts._digest_tasks)
+
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(run())
+
+    assert not stock_alerts._digest_tasks
+    assert "Low-stock digest failed" in caplog.text
@@ -0,0 +1,21 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.telemetry import RequestStats, request_stats
+
+
+def test_request_stats_add_up_across_threads():
+    stats = RequestStats()
+    token = request_stats.set(stats)
+
+    def record():
+        for _ in range(10_000):
+            request_stats.get().add_statement(0.001)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for future in [pool.submit(contextvars.copy_context().run, record) for _ in range(8)]:
+            future.result()
+    request_stats.reset(token)
+
+    assert stats.statements == 80_000
+    assert abs(stats.db_seconds - 80.0) < 1e-6
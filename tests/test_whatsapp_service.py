@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+import httpx
+import pytest
+
+from app.services import whatsapp_service
+from app.utils.phone import mask_phone, mask_phones
+
+TO = "+919876543210"
+
+
+def send_with(handler, monkeypatch) -> tuple:
+    attempts = []
+
+    def counting(request):
+        attempts.append(request)
+        return handler(request)
+
+    monkeypatch.setattr(whatsapp_service, "_retry_delay", lambda attempt, retry_after=None: 0)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(counting)) as client:
+            return await whatsapp_service._post_with_retries(client, TO, "hello")
+
+    return asyncio.run(run()), len(attempts)
+
+
+def test_read_timeout_is_not_retried(monkeypatch, caplog):
+    def handler(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    with caplog.at_level(logging.ERROR):
+        sent, attempts = send_with(handler, monkeypatch)
+
+    assert (sent, attempts) == (False, 1)
+    assert TO not in caplog.text
+    assert "+********3210" in caplog.text
+
+
+@pytest.mark.parametrize("error", [httpx.ConnectError, httpx.ConnectTimeout])
+def test_connect_errors_are_retried(monkeypatch, error):
+    def handler(request):
+        if not handler.failed:
+            handler.failed = True
+            raise error("refused", request=request)
+        return httpx.Response(201, json={"sid": "SM1"})
+
+    handler.failed = False
+
+    assert send_with(handler, monkeypatch) == (True, 2)
+
+
+def test_twilio_errors_are_logged_without_the_number(monkeypatch, caplog):
+    def handler(request):
+        return httpx.Response(400, json={"code": 21211, "message": f"The 'To' number {TO} is not valid"})
+
+    with caplog.at_level(logging.ERROR):
+        sent, _ = send_with(handler, monkeypatch)
+
+    assert not sent
+    assert TO not in caplog.text
+
+
+def test_mask_phone():
+    assert mask_phone(TO) == "+********3210"
+    assert mask_phones(f"to whatsapp:{TO} failed") == "to whatsapp:+********3210 failed"